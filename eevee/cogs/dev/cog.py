@@ -374,6 +374,37 @@ class Dev:
         tables_str = [t['table_name'] for t in tables]
         await ctx.info('Database Tables', '\n'.join(tables_str))
 
+    @database_.command(name='cache')
+    async def cache_(self, ctx):
+        dbi = ctx.bot.dbi
+        settings = ctx.bot.data.settings_cache
+        results = dbi.result_cache
+        schema = dbi.schema_cache
+        fields = {
+            'Prepared Statements': (
+                f"{dbi.pool_options['statement_cache_size']} "
+                f"per connection"),
+            'Schema': (
+                f"{len(schema)} tables cached\n"
+                f"{schema.stats['hits']} hits\n"
+                f"{schema.stats['misses']} misses\n"
+                f"{schema.stats['loads']} loads"),
+            'Guild Settings': (
+                f"{len(settings)} guilds cached\n"
+                f"{settings.stats['hits']} hits\n"
+                f"{settings.stats['misses']} misses\n"
+                f"{settings.stats['evictions']} evictions\n"
+                f"{settings.hit_rate:.1%} hit rate"),
+            'Query Results': (
+                f"{len(results)} cached\n"
+                f"{results.stats['hits']} hits\n"
+                f"{results.stats['misses']} misses\n"
+                f"{results.stats['shared']} shared\n"
+                f"{results.stats['invalidations']} invalidations\n"
+                f"{results.stats['evictions']} evictions"),
+        }
+        await ctx.info('Database Caches', fields=fields, inline=True)
+
     @database_.command(name='table')
     async def table_(self, ctx, *table_names):
         if not table_names:
@@ -421,7 +452,8 @@ class Dev:
     @command()
     @checks.is_co_owner()
     async def sql(self, ctx, *, query):
-        results = await ctx.bot.dbi.execute_transaction(query)
+        results = await ctx.bot.dbi.execute_transaction(
+            query, cache_statement=False)
         if len(results) == 1:
             results = results[0]
         await ctx.codeblock(str(results), "")
@@ -444,7 +476,8 @@ class Dev:
     async def last_exception(self, ctx, count=1):
         table = ctx.bot.dbi.table('eevee_logs')
         query = table.query.order_by('created', asc=False).limit(count)
-        results = await query.get()
+        # new log records invalidate this through the insert builder
+        results = await query.cached(ttl=300).get()
         output = []
         for rcrd in results:
             details = []
@@ -1,34 +1,58 @@
 import asyncio
-import json
-import os
-import sqlite3
 from functools import partial
 
 import discord
 
-from eevee import group
+from eevee import group, Cog
 from eevee.utils import make_embed, url_color
 from eevee.utils.converters import Multi
-from eevee.utils.formatters import code
+from eevee.utils.formatters import code, colour_cache
 
+from .compiled import _lazy, load_pokedex
+from .flavor import FlavorText
+from .index import PokedexIndex
 from .objects import Pokemon
 from .errors import PokemonNotFound
 
+class PokeData:
+    """Bot-wide Pokemon data, built from the compiled Pokedex on first use."""
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.compiled = load_pokedex(data_dir)
+
+    @property
+    def raid_pokemon(self):
+        return self.compiled.raid_pokemon
+
+    @property
+    def raid_eggs(self):
+        return self.compiled.raid_eggs
+
+    @property
+    def type_chart(self):
+        return self.compiled.type_chart
+
+    @_lazy
+    def pokedex(self):
+        return PokedexIndex(
+            self.compiled.pkmn_info(), self.type_chart, self.raid_pokemon)
+
+    @_lazy
+    def flavor_text(self):
+        return FlavorText.from_data_dir(self.data_dir, self.compiled)
+
+
 def init_pokedata(bot):
     bot.pokemon = partial(Pokemon, bot)
-    with open(os.path.join(bot.data_dir, "raid_info.json")) as fp:
-        bot.raid_info_json = json.load(fp)
-        bot.raid_pokemon = bot.raid_info_json["raid_pkmn"]
-        bot.raid_eggs = bot.raid_info_json["raid_eggs"]
-    with open(os.path.join(bot.data_dir, "pkmn_info.json")) as fp:
-        bot.pkmn_info_json = json.load(fp)
-        bot.pkmn_info = bot.pkmn_info_json["pokemon"]
-        bot.type_chart = bot.pkmn_info_json["type_chart"]
+    bot.pokedata = PokeData(bot.data_dir)
 
 
-class Pokedex:
+class Pokedex(Cog):
     """Pokemon Information and Management"""
 
+    prewarm_limit = 4
+
     def __init__(self, bot):
         self.bot = bot
         self.bot.config.command_categories["Pokedex"] = {
@@ -37,6 +61,54 @@ class Pokedex:
         }
         self.type_emoji = bot.config.type_emoji
         init_pokedata(bot)
+        self.prewarm_task = None
+
+    async def _table_setup(self, table_module):
+        await super()._table_setup(table_module)
+        await self.load_colours()
+        if getattr(self.bot.config, 'prewarm_colours', False):
+            self.prewarm_task = self.bot.loop.create_task(
+                self.prewarm_colours())
+
+    def __unload(self):
+        if self.prewarm_task:
+            self.prewarm_task.cancel()
+
+    def image_urls(self):
+        """Return the image URLs of all Pokemon and raid eggs."""
+        urls = [self.bot.pokemon(name).img_url
+                for name in self.bot.pokedata.pokedex.names]
+        eggs = self.bot.pokedata.raid_eggs
+        urls.extend(egg['img_url'] for egg in eggs.values())
+        return urls
+
+    async def load_colours(self):
+        """Load saved image colours into the colour cache."""
+        rows = await self.tables.image_colours.query.get()
+        for row in rows:
+            colour = discord.Colour(row['colour'])
+            colour_cache.set(row['url'], colour.to_rgb())
+        self.logger.info(f'Loaded {len(rows)} saved image colours.')
+
+    async def prewarm_colours(self):
+        """Find and save the colours of all images not yet cached."""
+        urls = [url for url in self.image_urls() if url not in colour_cache]
+        semaphore = asyncio.Semaphore(self.prewarm_limit)
+        writer = self.bot.dbi.writer
+
+        async def prewarm(url):
+            async with semaphore:
+                try:
+                    rgb = await colour_cache.get(url)
+                except Exception as e:
+                    self.logger.warning(f'Colour for {url} not found: {e}')
+                    return
+            await writer.add(
+                'image_colours', conflict=True, primaries=('url',),
+                url=url, colour=discord.Colour.from_rgb(*rgb).value)
+
+        await asyncio.gather(*(prewarm(url) for url in urls))
+        self.logger.info(f'Prewarmed {len(urls)} image colours.')
 
     async def on_command_error(self, ctx, error):
         if isinstance(error, PokemonNotFound):
@@ -46,13 +118,7 @@ class Pokedex:
         return self.type_emoji[type.lower()]
 
     def get_flavor(self, pkmn_id):
-        conn = sqlite3.connect(os.path.join(self.bot.data_dir, 'pokedex-temp.sqlite'))
-        c = conn.cursor()
-        c.execute('SELECT species_id, flavor_text '
-                  'FROM pokemon_species_flavor_text '
-                  'WHERE version_id = 26 AND language_id = 9 '
-                  'AND species_id = {}'.format(pkmn_id))
-        return c.fetchone()[1]
+        return self.bot.pokedata.flavor_text.get(pkmn_id)
 
     def pd_raid_info(self, pokemon):
         msg = (
@@ -89,8 +155,7 @@ class Pokedex:
 
     async def pd_pokemon(self, pokemon, only_type=False, only_raid=False):
         pkmn_no = str(pokemon.id).zfill(3)
-        pkmn_url = ('https://raw.githubusercontent.com/FoglyOgly/'
-                    f'Meowth/master/images/pkmn/{pkmn_no}_.png')
+        pkmn_url = pokemon.img_url
         pkmn_colour = await url_color(pkmn_url)
         embed = make_embed(
             image=pkmn_url,
@@ -112,7 +177,11 @@ class Pokedex:
 
         else:
             header = f'{types_str} #{pkmn_no} - {pokemon.name.capitalize()}'
-            description = code(self.get_flavor(pokemon.id).replace('\n', ' '))
+            flavor = self.get_flavor(pokemon.id)
+            if flavor:
+                description = code(flavor.replace('\n', ' '))
+            else:
+                description = 'No description available.'
 
         embed.add_field(name=header, value=description, inline=False)
 
@@ -185,13 +254,9 @@ class Pokedex:
         """Return Raid Info"""
         if isinstance(arg, int):
             raid_level = arg
-            raid_egg_url = ctx.bot.raid_eggs[f'{raid_level}']['img_url']
+            raid_egg_url = ctx.bot.pokedata.raid_eggs[f'{raid_level}']['img_url']
             raid_egg_colour = await url_color(raid_egg_url)
-            pkmn_list = []
-            for k, v in ctx.bot.raid_pokemon.items():
-                level = v['level']
-                if level == raid_level:
-                    pkmn_list.append(k)
+            pkmn_list = ctx.bot.pokedata.pokedex.raid_levels.get(raid_level, ())
             embed = make_embed(
                 msg_type='info',
                 title=f'Level {raid_level} Raid List',
@@ -0,0 +1,318 @@
+"""Compiled binary Pokedex data.
+
+The Pokemon, raid and flavor text JSON files are compiled into a single
+file of fixed-size records with one shared string table. The file is
+memory-mapped and each section is only decoded when first used.
+
+Build it ahead of time with::
+
+    python -m eevee.cogs.pokemon.compiled [data_dir]
+
+or let :func:`load_pokedex` build it when it's missing or out of date.
+
+Layout, all little-endian:
+
+* header: magic ``EVPD``, format version (H), section count (H)
+* section table: name (8s), offset (I), size (I) per section
+* ``strings``: count (I), count + 1 offsets (I), UTF-8 data
+* ``types``: string index (I) per type
+* ``chart``: types x types effectiveness (d), defending type rows
+* ``pokemon``: name, type 1, type 2, flavor (IHHI) per Pokedex ID
+* ``raids``: Pokedex ID, level, exraid, max CP, boosted max CP (HBBII)
+* ``eggs``: level, image URL (BI)
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from types import MappingProxyType
+
+MAGIC = b'EVPD'
+FORMAT_VERSION = 1
+FILENAME = 'pokedex.bin'
+SOURCES = ('pkmn_info.json', 'raid_info.json', 'pkmn_info_new.json')
+
+NONE16 = 0xFFFF
+NONE32 = 0xFFFFFFFF
+EXRAID_UNSET = 2
+
+HEADER = struct.Struct('<4sHH')
+SECTION = struct.Struct('<8sII')
+POKEMON = struct.Struct('<IHHI')
+RAID = struct.Struct('<HBBII')
+EGG = struct.Struct('<BI')
+
+
+class PokedexFormatError(Exception):
+    """Compiled Pokedex file is invalid or of another format version."""
+
+
+class _Strings:
+    def __init__(self):
+        self.index = {}
+        self.values = []
+
+    def __call__(self, value):
+        if value is None:
+            return NONE32
+        idx = self.index.get(value)
+        if idx is None:
+            idx = self.index[value] = len(self.values)
+            self.values.append(value)
+        return idx
+
+    def pack(self):
+        data = [s.encode('utf-8') for s in self.values]
+        offsets = array('I', [0])
+        for item in data:
+            offsets.append(offsets[-1] + len(item))
+        return struct.pack('<I', len(data)) + offsets.tobytes() + b''.join(data)
+
+def compile_pokedex(data_dir):
+    """Compile the Pokedex JSON files in the data dir, returning bytes."""
+    def load(name):
+        path = os.path.join(data_dir, name)
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding='utf-8') as fp:
+            return json.load(fp)
+
+    pkmn_info = load('pkmn_info.json')
+    raid_info = load('raid_info.json')
+    flavors = load('pkmn_info_new.json').get('pokemon', {})
+
+    strings = _Strings()
+    type_chart = pkmn_info['type_chart']
+    type_names = list(type_chart)
+    for atk_types in type_chart.values():
+        type_names.extend(t for t in atk_types if t not in type_names)
+    type_ids = {t: i for i, t in enumerate(type_names)}
+    types = array('I', (strings(t) for t in type_names))
+
+    chart = array('d', [1.0] * len(type_names) ** 2)
+    for def_type, atk_types in type_chart.items():
+        for atk_type, value in atk_types.items():
+            chart[type_ids[def_type] * len(type_names) + type_ids[atk_type]] = value
+
+    pokemon = []
+    pkmn_ids = {}
+    for pkmn_id, (name, info) in enumerate(pkmn_info['pokemon'].items(), 1):
+        pkmn_ids[name] = pkmn_id
+        pkmn_types = [type_ids[t] for t in info['types']] + [NONE16, NONE16]
+        flavor = flavors.get(f'{pkmn_id:03}', {}).get('flavor')
+        pokemon.append(POKEMON.pack(
+            strings(name), pkmn_types[0], pkmn_types[1], strings(flavor)))
+
+    raids = []
+    for name, info in raid_info.get('raid_pkmn', {}).items():
+        exraid = int(info['exraid']) if 'exraid' in info else EXRAID_UNSET
+        raids.append(RAID.pack(
+            pkmn_ids[name], info['level'], exraid,
+            info['max_cp'], info['max_cp_w']))
+
+    eggs = [EGG.pack(int(level), strings(egg['img_url']))
+            for level, egg in raid_info.get('raid_eggs', {}).items()]
+
+    sections = [
+        (b'types', types.tobytes()),
+        (b'chart', chart.tobytes()),
+        (b'pokemon', b''.join(pokemon)),
+        (b'raids', b''.join(raids)),
+        (b'eggs', b''.join(eggs)),
+        (b'strings', strings.pack()),
+    ]
+
+    offset = HEADER.size + SECTION.size * len(sections)
+    table = []
+    for name, data in sections:
+        table.append(SECTION.pack(name, offset, len(data)))
+        offset += len(data)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, len(sections))
+    return b''.join([header, *table, *(data for __, data in sections)])
+
+def build_pokedex(data_dir, path=None):
+    """Compile the Pokedex JSON files to the compiled file."""
+    path = path or os.path.join(data_dir, FILENAME)
+    data = compile_pokedex(data_dir)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as fp:
+        fp.write(data)
+    os.replace(tmp_path, path)
+    return path
+
+
+class _lazy:
+    """Decode a section the first time it's used."""
+
+    def __init__(self, func):
+        self.func = func
+        self.name = func.__name__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        value = self.func(instance)
+        setattr(instance, self.name, value)
+        return value
+
+
+class PokedexData:
+    """Read-only view of compiled Pokedex data.
+
+    Parameters
+    -----------
+    buffer:
+        A buffer holding the compiled data, such as a :class:`mmap.mmap`.
+    """
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        magic, version, count = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise PokedexFormatError('Not a compiled Pokedex file.')
+        if version != FORMAT_VERSION:
+            raise PokedexFormatError(
+                f'Compiled Pokedex version {version} is not supported.')
+        self._sections = {}
+        for i in range(count):
+            name, offset, size = SECTION.unpack_from(
+                buffer, HEADER.size + SECTION.size * i)
+            self._sections[name.rstrip(b'\0')] = (offset, size)
+
+    @classmethod
+    def open(cls, path):
+        """Memory-map a compiled Pokedex file."""
+        with open(path, 'rb') as fp:
+            buffer = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buffer)
+
+    def _section(self, name):
+        offset, size = self._sections[name]
+        return memoryview(self._buffer)[offset:offset+size]
+
+    @_lazy
+    def _string_offsets(self):
+        data = self._section(b'strings')
+        count, = struct.unpack_from('<I', data)
+        offsets = array('I')
+        offsets.frombytes(data[4:8+count*4])
+        return offsets
+
+    def string(self, idx):
+        if idx == NONE32:
+            return None
+        offsets = self._string_offsets
+        base = self._sections[b'strings'][0] + 4 + len(offsets) * 4
+        return self._buffer[base+offsets[idx]:base+offsets[idx+1]].decode()
+
+    @_lazy
+    def type_names(self):
+        """:class:`tuple` of all type names, in chart order."""
+        idxs = array('I')
+        idxs.frombytes(self._section(b'types'))
+        return tuple(self.string(i) for i in idxs)
+
+    @_lazy
+    def type_chart(self):
+        """Defending types mapped to attacking types with a non-neutral
+        effectiveness, as in ``pkmn_info.json``.
+        """
+        values = array('d')
+        values.frombytes(self._section(b'chart'))
+        names = self.type_names
+        chart = {}
+        for d, def_type in enumerate(names):
+            row = values[d*len(names):(d+1)*len(names)]
+            chart[def_type] = {
+                names[a]: v for a, v in enumerate(row) if v != 1.0}
+        return MappingProxyType(chart)
+
+    def __len__(self):
+        return self._sections[b'pokemon'][1] // POKEMON.size
+
+    def _pokemon(self, pkmn_id):
+        return POKEMON.unpack_from(
+            self._section(b'pokemon'), (pkmn_id - 1) * POKEMON.size)
+
+    def pokemon(self):
+        """Yield ``(name, types)`` for each Pokemon in Pokedex order."""
+        names = self.type_names
+        for record in POKEMON.iter_unpack(self._section(b'pokemon')):
+            name, type1, type2, __ = record
+            types = [names[t] for t in (type1, type2) if t != NONE16]
+            yield self.string(name), types
+
+    def pkmn_info(self):
+        """Return Pokemon names mapped to their info, as in
+        ``pkmn_info.json``.
+        """
+        return {name: {'types': types} for name, types in self.pokemon()}
+
+    def flavor(self, pkmn_id):
+        """Return the flavor text for a Pokedex ID, or ``None``."""
+        if not 0 < pkmn_id <= len(self):
+            return None
+        return self.string(self._pokemon(pkmn_id)[3])
+
+    @_lazy
+    def raid_pokemon(self):
+        """Raid Pokemon names mapped to their info, as in
+        ``raid_info.json``.
+        """
+        raids = {}
+        for record in RAID.iter_unpack(self._section(b'raids')):
+            pkmn_id, level, exraid, max_cp, max_cp_w = record
+            info = {'level': level, 'max_cp': max_cp, 'max_cp_w': max_cp_w}
+            if exraid != EXRAID_UNSET:
+                info['exraid'] = bool(exraid)
+            raids[self.string(self._pokemon(pkmn_id)[0])] = info
+        return raids
+
+    @_lazy
+    def raid_eggs(self):
+        """Raid egg levels mapped to their info, as in ``raid_info.json``."""
+        return {
+            str(level): {'img_url': self.string(url)}
+            for level, url in EGG.iter_unpack(self._section(b'eggs'))
+        }
+
+def load_pokedex(data_dir):
+    """Open the compiled Pokedex in the data dir.
+
+    The file is rebuilt first if it's missing, older than any of its JSON
+    sources or of another format version. If it can't be written, the
+    data is compiled in memory instead.
+    """
+    path = os.path.join(data_dir, FILENAME)
+    sources = [os.path.join(data_dir, s) for s in SOURCES]
+    try:
+        built = os.path.getmtime(path)
+    except OSError:
+        built = None
+    stale = built is None or any(
+        os.path.getmtime(s) > built for s in sources if os.path.exists(s))
+    if not stale:
+        try:
+            return PokedexData.open(path)
+        except PokedexFormatError:
+            pass
+    try:
+        build_pokedex(data_dir, path)
+    except OSError:
+        return PokedexData(compile_pokedex(data_dir))
+    return PokedexData.open(path)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        data_dir = argv[0]
+    else:
+        here = os.path.dirname(os.path.realpath(__file__))
+        data_dir = os.path.join(here, '..', '..', 'data')
+    print(f'Compiled Pokedex saved to {build_pokedex(data_dir)}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+import json
+import os
+import sqlite3
+
+DEFAULT_VERSION = 26
+DEFAULT_LANGUAGE = 9
+
+
+class FlavorText:
+    """In-memory store of Pokedex flavor text.
+
+    Texts are indexed by language and game version, then by species ID,
+    so lookups don't touch the disk. Texts for the default language and
+    version not added to the store are read from the compiled Pokedex data,
+    if given.
+
+    Parameters
+    -----------
+    compiled: :class:`.compiled.PokedexData`, optional
+        Compiled Pokedex data to read default texts from.
+    """
+
+    __slots__ = ('_texts', 'compiled')
+
+    def __init__(self, compiled=None):
+        self._texts = {}
+        self.compiled = compiled
+
+    def __len__(self):
+        return sum(len(texts) for texts in self._texts.values())
+
+    def add(self, species_id, text, version=DEFAULT_VERSION,
+            language=DEFAULT_LANGUAGE):
+        self._texts.setdefault((language, version), {})[species_id] = text
+
+    def get(self, species_id, version=DEFAULT_VERSION,
+            language=DEFAULT_LANGUAGE):
+        """Return the flavor text for a species, or ``None``."""
+        texts = self._texts.get((language, version), {})
+        text = texts.get(species_id)
+        if text is None and self.compiled:
+            if (language, version) == (DEFAULT_LANGUAGE, DEFAULT_VERSION):
+                return self.compiled.flavor(species_id)
+        return text
+
+    def load_json(self, path):
+        """Load the default version's texts from a ``pkmn_info_new.json``
+        style file.
+        """
+        with open(path) as fp:
+            pokemon = json.load(fp)["pokemon"]
+        for species_id, info in pokemon.items():
+            if 'flavor' in info:
+                self.add(int(species_id), info['flavor'])
+
+    def load_sqlite(self, path, languages=(DEFAULT_LANGUAGE,)):
+        """Load all versions' texts for the languages from a veekun style
+        SQLite Pokedex, opened read-only.
+        """
+        conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+        try:
+            placeholders = ', '.join('?' for __ in languages)
+            rows = conn.execute(
+                'SELECT species_id, version_id, language_id, flavor_text '
+                'FROM pokemon_species_flavor_text '
+                f'WHERE language_id IN ({placeholders})', tuple(languages))
+            for species_id, version, language, text in rows:
+                self.add(species_id, text, version, language)
+        finally:
+            conn.close()
+
+    @classmethod
+    def from_data_dir(cls, data_dir, compiled=None):
+        """Build the store from the flavor text files in the data dir."""
+        flavor = cls(compiled)
+        json_path = os.path.join(data_dir, 'pkmn_info_new.json')
+        if not compiled and os.path.exists(json_path):
+            flavor.load_json(json_path)
+        sqlite_path = os.path.join(data_dir, 'pokedex-temp.sqlite')
+        if os.path.exists(sqlite_path):
+            flavor.load_sqlite(sqlite_path)
+        return flavor
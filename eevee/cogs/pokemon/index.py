@@ -0,0 +1,181 @@
+from itertools import combinations
+from types import MappingProxyType
+
+import numpy as np
+
+from eevee.utils.fuzzymatch import FuzzyIndex
+
+
+class PokedexIndex:
+    """Read-only lookup tables for Pokemon data.
+
+    Built once when the Pokemon data is loaded, so that creating and
+    querying :class:`Pokemon` instances doesn't need to search the raw
+    data each time.
+
+    Parameters
+    -----------
+    pkmn_info: :class:`dict`
+        Pokemon names mapped to their info, in Pokedex order.
+    type_chart: :class:`dict`
+        Defending types mapped to the attacking types with a non-neutral
+        effectiveness.
+    raid_pokemon: :class:`dict`
+        Raid Pokemon names mapped to their raid info.
+
+    Attributes
+    -----------
+    names: :class:`tuple` of :class:`str`
+        Pokemon names in Pokedex order.
+    ids: :class:`types.MappingProxyType`
+        Pokemon names mapped to their ID.
+    name_index: :class:`eevee.utils.fuzzymatch.FuzzyIndex`
+        Fuzzy matcher for Pokemon names.
+    types: :class:`types.MappingProxyType`
+        Pokemon names mapped to a :class:`tuple` of their types.
+    type_names: :class:`tuple` of :class:`str`
+        All types, in the order used by the effectiveness arrays.
+    type_matrix: :class:`numpy.ndarray`
+        Effectiveness of each attacking type (columns) against each
+        defending type (rows).
+    combo_matrix: :class:`numpy.ndarray`
+        Effectiveness of each attacking type (columns) against every single
+        and dual type combination (rows).
+    combo_ids: :class:`types.MappingProxyType`
+        Sorted type combinations mapped to their row in ``combo_matrix``.
+    raid_info: :class:`types.MappingProxyType`
+        Raid Pokemon names mapped to their raid info.
+    raid_pokemon: :class:`frozenset`
+        Names of Pokemon that can show in raids.
+    raid_levels: :class:`types.MappingProxyType`
+        Raid levels mapped to a :class:`tuple` of Pokemon names.
+    """
+
+    __slots__ = ('names', 'ids', 'name_index', 'types', 'type_names', 'type_matrix',
+                 'combo_matrix', 'combo_ids', 'raid_info', 'raid_pokemon',
+                 'raid_levels', '_pkmn_combos')
+
+    def __init__(self, pkmn_info, type_chart, raid_pokemon):
+        self.names = tuple(pkmn_info)
+        self.ids = MappingProxyType(
+            {name: i for i, name in enumerate(self.names, 1)})
+        self.name_index = FuzzyIndex(self.names)
+        self.types = MappingProxyType(
+            {name: tuple(info['types']) for name, info in pkmn_info.items()})
+
+        type_names = list(type_chart)
+        for atk_types in type_chart.values():
+            type_names.extend(t for t in atk_types if t not in type_names)
+        self.type_names = tuple(type_names)
+        type_ids = {t: i for i, t in enumerate(self.type_names)}
+
+        type_matrix = np.ones((len(type_names), len(type_names)))
+        for def_type, atk_types in type_chart.items():
+            for atk_type, value in atk_types.items():
+                type_matrix[type_ids[def_type], type_ids[atk_type]] = value
+        type_matrix.flags.writeable = False
+        self.type_matrix = type_matrix
+
+        combos = [(t,) for t in self.type_names]
+        combos.extend(combinations(self.type_names, 2))
+        combo_matrix = np.ones((len(combos), len(type_names)))
+        for row, combo in zip(combo_matrix, combos):
+            for def_type in combo:
+                row *= type_matrix[type_ids[def_type]]
+        combo_matrix.flags.writeable = False
+        self.combo_matrix = combo_matrix
+        self.combo_ids = MappingProxyType(
+            {tuple(sorted(combo)): i for i, combo in enumerate(combos)})
+
+        pkmn_combos = np.array(
+            [self.combo_ids[tuple(sorted(self.types[n]))] for n in self.names],
+            dtype=np.intp)
+        pkmn_combos.flags.writeable = False
+        self._pkmn_combos = pkmn_combos
+
+        self.raid_info = MappingProxyType(
+            {name: MappingProxyType(info)
+             for name, info in raid_pokemon.items()})
+        self.raid_pokemon = frozenset(raid_pokemon)
+        raid_levels = {}
+        for name, info in raid_pokemon.items():
+            raid_levels.setdefault(info['level'], []).append(name)
+        self.raid_levels = MappingProxyType(
+            {level: tuple(names) for level, names in raid_levels.items()})
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    def get_name(self, pkmn_id):
+        """Return the name for a Pokemon ID, or ``None`` if not valid."""
+        if 0 < pkmn_id <= len(self.names):
+            return self.names[pkmn_id-1]
+        return None
+
+    def resolve(self, pkmn):
+        """Return the Pokemon name for a name or ID, or ``None``."""
+        if isinstance(pkmn, int):
+            return self.get_name(pkmn)
+        if pkmn.isdigit():
+            return self.get_name(int(pkmn))
+        return pkmn if pkmn in self.ids else None
+
+    def effects_row(self, types):
+        """Return the effectiveness array of attacking types against the
+        defending types.
+        """
+        return self.combo_matrix[self.combo_ids[tuple(sorted(types))]]
+
+    def type_effects(self, types, where=None):
+        """Return a dict of attacking types and their effectiveness against
+        the defending types.
+
+        Only attacking types with a non-neutral effectiveness are included,
+        unless ``where`` is given. ``where`` is called with the effectiveness
+        array and should return a boolean mask of the types to include.
+        """
+        row = self.effects_row(types)
+        mask = where(row) if where else row != 1
+        return {self.type_names[i]: float(row[i]) for i in np.flatnonzero(mask)}
+
+    def pokemon_effects(self, names):
+        """Return the effectiveness arrays for many Pokemon at once, with a
+        row for each Pokemon.
+        """
+        ids = np.fromiter((self.ids[n] - 1 for n in names), dtype=np.intp)
+        return self.combo_matrix[self._pkmn_combos[ids]]
+
+    def best_counters(self, names, count=3):
+        """Return the most effective attacking types against each Pokemon.
+
+        Parameters
+        -----------
+        names: iterable of :class:`str`
+            Names of the defending Pokemon.
+        count: :class:`int`
+            Number of attacking types to return for each Pokemon.
+
+        Returns
+        --------
+        :class:`dict`
+            Pokemon names mapped to a :class:`list` of ``(type, value)``
+            tuples, most effective first.
+        """
+        names = list(names)
+        if not names:
+            return {}
+        effects = self.pokemon_effects(names)
+        best = np.argsort(-effects, axis=1, kind='stable')[:, :count]
+        return {
+            name: [(self.type_names[i], float(row[i])) for i in cols]
+            for name, row, cols in zip(names, effects, best)
+        }
+
+    def raid_counters(self, level, count=3):
+        """Return the most effective attacking types against each raid
+        boss of a level.
+        """
+        return self.best_counters(self.raid_levels.get(level, ()), count)
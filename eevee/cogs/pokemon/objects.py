@@ -1,6 +1,7 @@
+import numpy as np
 from discord.ext import commands
 
-from eevee.utils import fuzzymatch, url_color
+from eevee.utils import url_color
 
 from .errors import PokemonNotFound
 
@@ -36,8 +37,8 @@ class Pokemon():
         Lowercase string representing the name of the Pokemon
     id: :class:`int`
         Pokemon ID number
-    types: :class:`list` of :class:`str`
-        A :class:`list` of the Pokemon's types
+    types: :class:`tuple` of :class:`str`
+        A :class:`tuple` of the Pokemon's types
     moveset: :class:`list` or :class:`tuple` of :class:`str`
         The two moves of this Pokemon
     weather: :class:`str`
@@ -48,23 +49,19 @@ class Pokemon():
         Current instance of Eevee
     """
 
-    __slots__ = ('name', 'id', 'types', 'bot', 'guild', 'pkmn_list',
+    __slots__ = ('name', 'id', 'types', 'bot', 'guild', 'pokedex',
                  'pb_raid', 'weather', 'moveset')
 
     def __init__(self, bot, pkmn, guild=None, **attribs):
         self.bot = bot
         self.guild = guild
-        self.pkmn_list = list(bot.pkmn_info.keys())
-        if pkmn.isdigit():
-            try:
-                pkmn = self.pkmn_list[int(pkmn)-1]
-            except IndexError:
-                pass
-        self.name = pkmn
-        if pkmn not in self.pkmn_list:
-            raise PokemonNotFound(pkmn)
-        self.id = self.pkmn_list.index(pkmn)+1
-        self.types = self._get_type(self.name)
+        self.pokedex = bot.pokedata.pokedex
+        name = self.pokedex.resolve(pkmn)
+        if name is None:
+            raise PokemonNotFound(str(pkmn))
+        self.name = name
+        self.id = self.pokedex.ids[name]
+        self.types = self.pokedex.types[name]
         self.pb_raid = None
         self.weather = attribs.get('weather', None)
         self.moveset = attribs.get('moveset', [])
@@ -154,26 +151,26 @@ class Pokemon():
     @property
     def is_raid(self):
         """:class:`bool` : Indicates if the pokemon can show in Raids"""
-        return self.name in list(self.bot.raid_pokemon.keys())
+        return self.name in self.pokedex.raid_pokemon
 
     @property
     def is_exraid(self):
         """:class:`bool` : Indicates if the pokemon can show in Raids"""
         if not self.is_raid:
             return False
-        return self.bot.raid_pokemon[self.name].get('exraid', False)
+        return self.pokedex.raid_info[self.name].get('exraid', False)
 
     @property
     def raid_level(self):
         """:class:`int` or :obj:`None` : Returns raid egg level"""
-        return (self.bot.raid_pokemon[self.name]["level"]
+        return (self.pokedex.raid_info[self.name]["level"]
                 if self.is_raid else None)
 
     def max_raid_cp(self, weather_boost=False):
         """:class:`int` or :obj:`None` : Returns max CP on capture after raid
         """
         key = "max_cp_w" if weather_boost else "max_cp"
-        return self.bot.raid_pokemon[self.name][key] if self.is_raid else None
+        return self.pokedex.raid_info[self.name][key] if self.is_raid else None
 
     def role(self, guild=None):
         """:class:`discord.Role` or :obj:`None` : Returns the role for
@@ -194,39 +191,23 @@ class Pokemon():
         """:class:`dict` : Returns a dict of all types the Pokemon is
         weak against.
         """
-        types_eff = {}
-        for t, v in self.type_effects.items():
-            if round(v, 3) > 1:
-                types_eff[t] = v
-        return types_eff
+        return self.pokedex.type_effects(
+            self.types, where=lambda row: row.round(3) > 1)
 
     @property
     def strong_against(self):
         """:class:`dict` : Returns a dict of all types the Pokemon is
         strong against.
         """
-        types_eff = {}
-        for t, v in self.type_effects.items():
-            if round(v, 3) < 1:
-                types_eff[t] = v
-        return types_eff
-
-    def _get_type(self, pkmn):
-        """:class:`list` : Returns the Pokemon's types"""
-        return self.bot.pkmn_info[pkmn]["types"]
+        return self.pokedex.type_effects(
+            self.types, where=lambda row: row.round(3) < 1)
 
     @property
     def type_effects(self):
         """:class:`dict` : Returns a dict of all Pokemon types and their
         relative effectiveness as values.
         """
-        type_eff = {}
-        for _type in self.types:
-            for atk_type in self.bot.type_chart[_type]:
-                if atk_type not in type_eff:
-                    type_eff[atk_type] = 1
-                type_eff[atk_type] *= self.bot.type_chart[_type][atk_type]
-        return type_eff
+        return self.pokedex.type_effects(self.types)
 
     @property
     def type_effects_grouped(self):
@@ -237,22 +218,18 @@ class Pokemon():
             * low
             * worst
         """
-        type_eff_dict = {
-            'ultra' : [],
-            'super' : [],
-            'low'   : [],
-            'worst' : []
+        row = self.pokedex.effects_row(self.types)
+        ultra = row > 1.9
+        super_ = (row > 1.3) & ~ultra
+        worst = row < 0.6
+        low = (row != 1) & ~(ultra | super_ | worst)
+        names = self.pokedex.type_names
+        return {
+            'ultra' : [names[i] for i in np.flatnonzero(ultra)],
+            'super' : [names[i] for i in np.flatnonzero(super_)],
+            'low'   : [names[i] for i in np.flatnonzero(low)],
+            'worst' : [names[i] for i in np.flatnonzero(worst)]
         }
-        for t, v in self.type_effects.items():
-            if v > 1.9:
-                type_eff_dict['ultra'].append(t)
-            elif v > 1.3:
-                type_eff_dict['super'].append(t)
-            elif v < 0.6:
-                type_eff_dict['worst'].append(t)
-            else:
-                type_eff_dict['low'].append(t)
-        return type_eff_dict
 
     @classmethod
     async def convert(cls, ctx, argument):
@@ -277,16 +254,18 @@ class Pokemon():
         :exc:`discord.ext.commands.BadArgument`
             The argument didn't match a Pokemon ID or name.
         """
+        pokedex = ctx.bot.pokedata.pokedex
+        result = None
         if argument.isdigit():
-            try:
-                match = list(ctx.bot.pkmn_info.keys())[int(argument)-1]
-                score = 100
-            except IndexError:
+            match = pokedex.get_name(int(argument))
+            if match is None:
                 raise commands.errors.BadArgument(
                     'Pokemon ID "{}" not valid'.format(argument))
+            score = 100
+        elif argument in pokedex:
+            match, score = argument, 100
         else:
-            pkmn_list = list(ctx.bot.pkmn_info.keys())
-            match, score = fuzzymatch.get_match(pkmn_list, argument)
+            match, score = pokedex.name_index.match(argument)
         if match:
             if score >= 80:
                 result = cls(ctx.bot, str(match), ctx.guild)
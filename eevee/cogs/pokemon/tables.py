@@ -0,0 +1,10 @@
+from eevee.core.data_manager import schema
+
+
+def setup(bot):
+    table = bot.dbi.table('image_colours')
+    table.new_columns = [
+        schema.StringColumn('url', primary_key=True),
+        schema.IntColumn('colour')
+    ]
+    return table
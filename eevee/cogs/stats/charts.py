@@ -0,0 +1,180 @@
+"""Chart rendering for the Statistics cog.
+
+The render functions take plain data and return PNG bytes so they can be
+run in worker processes, away from the bot's event loop.
+"""
+
+import asyncio
+import hashlib
+import io
+import os
+import pickle
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import matplotlib
+
+if os.name != 'nt':
+    matplotlib.use('Agg')
+
+import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
+
+
+def _to_png(fig, **options):
+    plot_bytes = io.BytesIO()
+    fig.savefig(
+        plot_bytes,
+        format='png',
+        facecolor='#32363C',
+        transparent=True,
+        **options)
+    plt.close(fig)
+    return plot_bytes.getvalue()
+
+def render_msgcount(hour_starts, msg_counts):
+    """Histogram of messages sent over time."""
+    dates = mdates.epoch2num(hour_starts)
+
+    fig, ax = plt.subplots(linewidth=0, sharey=True, tight_layout=True)
+    fig.set_size_inches(8, 4)
+    ax.tick_params(labelsize=12, color='lightgrey', labelcolor='lightgrey')
+
+    locator = mdates.AutoDateLocator()
+    ax.xaxis.set_major_locator(locator)
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%d %b'))
+
+    __, bins, __ = ax.hist(
+        dates, 10, weights=msg_counts, facecolor='red', alpha=0.75)
+    ax.set_xticks(bins)
+
+    return _to_png(fig)
+
+def render_mostactive(labels, counts):
+    """Horizontal bar chart of message counts per member."""
+    matplotlib.rc('font', family='Roboto Medium')
+
+    fig, ax = plt.subplots(linewidth=0, sharey=True, tight_layout=True)
+    fig.set_size_inches(8, 5)
+    ax.tick_params(labelsize=12, color='lightgrey', labelcolor='lightgrey')
+    ax.barh(labels, counts, color='r', height=1.0, linewidth=1,
+            edgecolor='black')
+    ax.invert_yaxis()
+
+    return _to_png(fig, antialiased=True)
+
+def render_msgactivity(hours, counts):
+    """Line chart of message counts per hour of the day."""
+    matplotlib.rc('font', family='Roboto Medium')
+
+    fig, ax = plt.subplots(linewidth=0, tight_layout=True)
+    fig.set_size_inches(12, 5)
+    ax.tick_params(labelsize=20, color='lightgrey', labelcolor='lightgrey')
+    ax.plot(hours, counts, color='r', linewidth=4)
+    ax.set_xlabel("UTC Hours", color='lightgrey', fontsize="xx-large")
+    ax.set_xticks(hours)
+    for i in hours:
+        ax.axvline(x=i)
+
+    return _to_png(fig, antialiased=True)
+
+CHARTS = {
+    'msgcount'    : render_msgcount,
+    'mostactive'  : render_mostactive,
+    'msgactivity' : render_msgactivity,
+}
+
+
+class ChartRenderer:
+    """Renders charts in a process pool with a cache of recent results.
+
+    Parameters
+    -----------
+    max_workers: :class:`int`
+        Number of worker processes. Default is 2.
+    max_concurrent: :class:`int`
+        Maximum number of renders running or queued in the pool at once.
+        Default is 4.
+    max_cached: :class:`int`
+        Maximum number of rendered charts to keep. Default is 64.
+
+    Attributes
+    -----------
+    stats: :class:`collections.Counter`
+        Counts of cache ``hits``, ``misses``, ``evictions`` and worker pool
+        ``restarts``.
+    """
+
+    def __init__(self, *, max_workers=2, max_concurrent=4, max_cached=64):
+        self.max_workers = max_workers
+        self.max_concurrent = max_concurrent
+        self.max_cached = max_cached
+        self.stats = Counter()
+        self._cache = OrderedDict()
+        self._executor = None
+        self._semaphore = None
+
+    def __len__(self):
+        return len(self._cache)
+
+    @staticmethod
+    def make_key(guild_id, kind, data):
+        digest = hashlib.sha1(pickle.dumps(data)).hexdigest()
+        return (guild_id, kind, digest)
+
+    async def render(self, guild_id, kind, *data):
+        """Return PNG bytes of a chart from :data:`CHARTS`.
+
+        Parameters
+        -----------
+        guild_id: :class:`int`
+            ID of the guild the chart is for.
+        kind: :class:`str`
+            Name of the chart in :data:`CHARTS`.
+        *data
+            Arguments for the render function.
+        """
+        key = self.make_key(guild_id, kind, data)
+        png = self._cache.get(key)
+        if png is not None:
+            self._cache.move_to_end(key)
+            self.stats['hits'] += 1
+            return png
+
+        self.stats['misses'] += 1
+        if not self._executor:
+            self._executor = ProcessPoolExecutor(self.max_workers)
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        async with self._semaphore:
+            executor = self._executor
+            try:
+                png = await self._run(executor, kind, data)
+            except BrokenProcessPool:
+                # a worker died, so start a new pool and try once more
+                if self._executor is executor:
+                    self._restart_executor()
+                png = await self._run(self._executor, kind, data)
+
+        self._cache[key] = png
+        while len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
+            self.stats['evictions'] += 1
+        return png
+
+    @staticmethod
+    async def _run(executor, kind, data):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(executor, CHARTS[kind], *data)
+
+    def _restart_executor(self):
+        self.stats['restarts'] += 1
+        self._executor.shutdown(wait=False)
+        self._executor = ProcessPoolExecutor(self.max_workers)
+
+    def close(self):
+        """Shut down the worker processes and clear the cache."""
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self._cache.clear()
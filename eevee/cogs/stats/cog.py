@@ -1,24 +1,22 @@
 import io
-import os
 import typing
 
 import discord
-import matplotlib
-
-if os.name != 'nt':
-    matplotlib.use('Agg')
-
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
 
 from eevee import checks, command
 from eevee.utils.converters import Guild
 
+from .charts import ChartRenderer
+
 
 class Statistics:
     """Statistics Tools"""
     def __init__(self, bot):
         self.bot = bot
+        self.charts = ChartRenderer()
+
+    def __unload(self):
+        self.charts.close()
 
     @command()
     async def msgcount(self, ctx, member: typing.Union[discord.Member, Guild] = None):
@@ -32,39 +30,23 @@ class Statistics:
 
         guild = guild or ctx.guild
         member = member or ctx.author
-        query = ctx.bot.dbi.table('discord_messages').query('sent')
-        query.where(guild_id=guild.id, is_edit=False, author_id=member.id)
-        query.order_by('sent', asc=False)
-        data = await query.get_values()
+        table = ctx.bot.dbi.table('message_activity')
+        query = table.query('hour_start', 'message_count')
+        query.where(guild_id=guild.id, author_id=member.id)
+        query.order_by('hour_start', asc=False)
+        data = await query.cached(ttl=60).get()
 
         if not data:
             return await ctx.error(
                 f"I haven't seen {member.display_name} before.")
 
-        dates = mdates.epoch2num(data)
-
-        fig, ax = plt.subplots(linewidth=0, sharey=True, tight_layout=True)
-        fig.set_size_inches(8, 4)
-        ax.tick_params(labelsize=12, color='lightgrey', labelcolor='lightgrey')
-
-        locator = mdates.AutoDateLocator()
-        ax.xaxis.set_major_locator(locator)
-        ax.xaxis.set_major_formatter(mdates.DateFormatter('%d %b'))
-
-        counts, bins, patches = ax.hist(dates, 10, facecolor='red', alpha=0.75)
-        ax.set_xticks(bins)
-
-        plot_bytes = io.BytesIO()
-        fig.savefig(
-            plot_bytes,
-            format='png',
-            facecolor='#32363C',
-            transparent=True)
-        plot_bytes.seek(0)
-        fig.clf()
+        hour_starts = [r['hour_start'] for r in data]
+        msg_counts = [r['message_count'] for r in data]
+        png = await self.charts.render(
+            guild.id, 'msgcount', hour_starts, msg_counts)
 
         fname = f"msgcount-{member.id}.png"
-        plot_file = discord.File(plot_bytes, filename=fname)
+        plot_file = discord.File(io.BytesIO(png), filename=fname)
 
         embed = await ctx.embed(
             f"Message Stats - {member.display_name} in {guild.name}", send=False)
@@ -73,15 +55,15 @@ class Statistics:
 
     @command()
     async def mostactive(self, ctx):
-        table = ctx.bot.dbi.table('discord_messages')
+        table = ctx.bot.dbi.table('message_activity')
         query = table.query(
             'author_id',
-            table['message_id'].count,
-            "rank() over (order by count(message_id) desc) as rank")
-        query.where(guild_id=ctx.guild.id, is_edit=False)
+            'sum(message_count)::bigint AS count',
+            "rank() over (order by sum(message_count) desc) as rank")
+        query.where(guild_id=ctx.guild.id)
         query.order_by('count', asc=False)
         query.group_by('author_id')
-        data = await query.get()
+        data = await query.cached(ttl=60).get()
 
         if not data:
             return await ctx.error('No data found.')
@@ -100,28 +82,11 @@ class Statistics:
             author_key = f"#{author_data['rank']} - {ctx.author}"
             data[author_key] = author_data['count']
 
-        # ax.bar(x, y, color='r', width=1.0, linewidth=0, tick_label=labels)
-
-        matplotlib.rc('font', family='Roboto Medium')
-
-        fig, ax = plt.subplots(linewidth=0, sharey=True, tight_layout=True)
-        fig.set_size_inches(8, 5)
-        ax.tick_params(labelsize=12, color='lightgrey', labelcolor='lightgrey')
-        ax.barh(list(data.keys()), list(data.values()), color='r', height=1.0, linewidth=1, edgecolor='black')
-        ax.invert_yaxis()
-
-        plot_bytes = io.BytesIO()
-        fig.savefig(
-            plot_bytes,
-            format='png',
-            facecolor='#32363C',
-            transparent=True,
-            antialiased=True)
-        plot_bytes.seek(0)
-        fig.clf()
+        png = await self.charts.render(
+            ctx.guild.id, 'mostactive', list(data.keys()), list(data.values()))
 
         fname = f"mostactive-{ctx.guild.id}.png"
-        plot_file = discord.File(plot_bytes, filename=fname)
+        plot_file = discord.File(io.BytesIO(png), filename=fname)
 
         embed = await ctx.embed(
             f"Message Activity Per Member - {ctx.guild.name}", send=False)
@@ -135,38 +100,30 @@ class Statistics:
         for all channels the bot can see.
         """
 
-        table = ctx.bot.dbi.table('discord_messages')
-        table.query('count(*) AS count', "date_part('hour', to_timestamp(sent)) AS hour")
-        table.query.where(is_edit=False, guild_id=ctx.guild.id).group_by('hour')
-        rawdata = await table.query.get()
+        table = ctx.bot.dbi.table('message_activity')
+        table.query('sum(message_count)::bigint AS count',
+                    "date_part('hour', to_timestamp(hour_start)) AS hour")
+        table.query.where(guild_id=ctx.guild.id).group_by('hour')
+        table.query.order_by('hour')
+        rawdata = await table.query.cached(ttl=60).get()
         data = {r['hour']: r['count'] for r in rawdata}
 
-        matplotlib.rc('font', family='Roboto Medium')
-        fig, ax = plt.subplots(linewidth=0, tight_layout=True)
-        fig.set_size_inches(12, 5)
-        ax.tick_params(labelsize=20, color='lightgrey', labelcolor='lightgrey')
-        ax.plot(list(data.keys()), list(data.values()), color='r', linewidth=4)
-        ax.set_xlabel("UTC Hours", color='lightgrey', fontsize="xx-large")
-        plt.xticks(list(data.keys()))
-        for i in list(data.keys()):
-            ax.axvline(x=i)
-
-        plot_bytes = io.BytesIO()
-
-        fig.savefig(
-            plot_bytes,
-            format='png',
-            facecolor='#32363C',
-            transparent=True,
-            antialiased=True
-        )
-
-        plot_bytes.seek(0)
-        fig.clf()
+        png = await self.charts.render(
+            ctx.guild.id, 'msgactivity', list(data.keys()), list(data.values()))
 
         fname = f"guild-msg-activity-{ctx.guild.id}.png"
-        plot_file = discord.File(plot_bytes, filename=fname)
+        plot_file = discord.File(io.BytesIO(png), filename=fname)
 
         embed = await ctx.embed(f"Hourly Message Activity - {ctx.guild.name}", send=False)
         embed.set_image(url=f"attachment://{fname}")
         await ctx.send(file=plot_file, embed=embed)
+
+    @command()
+    @checks.is_co_owner()
+    async def rebuildstats(self, ctx):
+        """Recount message activity stats from the full message history."""
+        logging_cog = ctx.bot.get_cog('ActivityLogging')
+        if not logging_cog:
+            return await ctx.error('Activity logging is not loaded.')
+        await logging_cog.rebuild_activity()
+        await ctx.success('Message activity stats rebuilt.')
@@ -1,5 +1,5 @@
 import datetime
-import pytz
+from collections import OrderedDict
 
 import pytzdata
 import pendulum
@@ -8,77 +8,60 @@ import discord
 from eevee import command, group, Cog, checks
 from eevee.utils import fuzzymatch
 
+from .zones import TimezoneIndex
+
 
 class Time(Cog):
     """Time Tools"""
     def __init__(self, bot):
         self.bot = bot
         self.tzdburl = 'https://github.com/sdispater/pytzdata/blob/master/pytzdata/_timezones.py'
-        self.timezones = None
-        self.get_timezones()
-
-    def get_timezones(self):
-        zone_tab = pytz.open_resource('zone.tab')
-        try:
-            data = {}
-            for line in zone_tab:
-                line = line.decode('UTF-8')
-                if line.startswith('#'):
-                    continue
-                code, coordinates, zone = line.split(None, 4)[:3]
-                if zone not in pytz.all_timezones_set:
-                    continue
-                try:
-                    data[code].append(zone)
-                except KeyError:
-                    data[code] = [zone]
-            self.timezones = data
-        finally:
-            zone_tab.close()
+        self.zones = TimezoneIndex()
+        self.timezones = self.zones.countries
+        self.max_cached_members = 10000
+        self._member_tzs = OrderedDict()
 
     def timezone_names(self):
-        tznames = {}
-        for tz in pytz.all_timezones:
-            name = pytz.timezone(tz).localize(datetime.datetime.now()).tzname()
-            try:
-                tznames[name].append(tz)
-            except KeyError:
-                tznames[name] = [tz,]
-        return tznames
+        return self.zones.timezone_names()
 
     def match_timezone(self, query):
-        # try it as-is first
-        try:
-            pytz.timezone(query)
-            return [(query, 100),]
-        except pytz.UnknownTimeZoneError:
-            pass
-
-        # check if in tz names
-        tz_names = self.timezone_names()
-        if query.upper() in tz_names:
-            return [(tz, 100) for tz in tz_names[query.upper()]]
-
-        # fuzzymatch against all timezones as last resort
-        matches = fuzzymatch.get_matches(tz_names.keys(), query, 80)
-
-        commontz_matches = fuzzymatch.get_matches(
-            pytz.common_timezones, query, 90, True)
-
-        if commontz_matches:
-            matches.extend(commontz_matches)
-
-        fullmatches = [(tz, 100) for tz, s in matches if s == 100]
-        if len(fullmatches) == 1:
-            return fullmatches
-
-        return matches
+        return self.zones.match(query)
+
+    def _cache_timezone(self, member_id, timezone):
+        self._member_tzs[member_id] = timezone
+        self._member_tzs.move_to_end(member_id)
+        while len(self._member_tzs) > self.max_cached_members:
+            self._member_tzs.popitem(last=False)
+
+    async def get_timezones(self, member_ids):
+        """Return a dict of member IDs mapped to their timezone.
+
+        Members without a timezone are mapped to ``None``. Members that
+        aren't cached are loaded together in a single query.
+        """
+        result = {}
+        missing = []
+        for member_id in dict.fromkeys(member_ids):
+            if member_id in self._member_tzs:
+                self._member_tzs.move_to_end(member_id)
+                result[member_id] = self._member_tzs[member_id]
+            else:
+                missing.append(member_id)
+        if missing:
+            table = self.bot.dbi.table('member_timezones')
+            table.query('member_id', 'timezone')
+            table.query.where(table['member_id'].in_(missing))
+            rows = await table.query.get()
+            found = {r['member_id']: r['timezone'] for r in rows}
+            for member_id in missing:
+                timezone = found.get(member_id)
+                self._cache_timezone(member_id, timezone)
+                result[member_id] = timezone
+        return result
 
     async def get_timezone(self, member_id):
-        table = self.bot.dbi.table('member_timezones')
-        table.query('timezone')
-        table.query.where(member_id=member_id)
-        return await table.query.get_value()
+        timezones = await self.get_timezones([member_id])
+        return timezones[member_id]
 
     async def verify_timezone(self, ctx, timezone):
 
@@ -170,6 +153,7 @@ class Time(Cog):
             timezone=str(timezone))
         table.insert.primaries('member_id')
         await table.insert.commit(do_update=True)
+        self._cache_timezone(member.id, str(timezone))
 
         await ctx.success(
             f'Timezone for {member.display_name} saved as {timezone}.')
@@ -183,6 +167,7 @@ class Time(Cog):
 
         query = ctx.bot.dbi.table('member_timezones').query
         await query.delete(member_id=member.id)
+        self._cache_timezone(member.id, None)
 
         await ctx.success(
             f'Timezone for {member.display_name} removed.')
@@ -0,0 +1,135 @@
+import datetime
+from bisect import bisect_right
+from collections import OrderedDict
+
+import pytz
+
+from eevee.utils.fuzzymatch import FuzzyIndex
+
+
+class TimezoneIndex:
+    """Lookup tables for resolving timezone names.
+
+    The zone.tab country map, the index of current timezone abbreviations
+    and the fuzzy matchers are built once. Abbreviations change when zones
+    enter or leave daylight saving time, so the abbreviation index is
+    rebuilt the first time it's used after the next transition of any zone.
+
+    Parameters
+    -----------
+    cache_size: :class:`int`
+        Maximum number of resolved queries to cache. Default is 256.
+
+    Attributes
+    -----------
+    countries: :class:`dict`
+        Country codes mapped to a :class:`list` of their zones.
+    abbreviations: :class:`dict`
+        Current timezone abbreviations mapped to a :class:`list` of zones.
+    next_transition: :class:`datetime.datetime`
+        Naive UTC time of the next transition, or ``None``.
+    """
+
+    def __init__(self, *, cache_size=256):
+        self.cache_size = cache_size
+        self.countries = self._load_countries()
+        self.common_index = FuzzyIndex(pytz.common_timezones)
+        self.abbreviations = {}
+        self.abbreviation_index = None
+        self.next_transition = None
+        self._cache = OrderedDict()
+        self.refresh()
+
+    @staticmethod
+    def _load_countries():
+        zone_tab = pytz.open_resource('zone.tab')
+        try:
+            data = {}
+            for line in zone_tab:
+                line = line.decode('UTF-8')
+                if line.startswith('#'):
+                    continue
+                code, coordinates, zone = line.split(None, 4)[:3]
+                if zone not in pytz.all_timezones_set:
+                    continue
+                try:
+                    data[code].append(zone)
+                except KeyError:
+                    data[code] = [zone]
+            return data
+        finally:
+            zone_tab.close()
+
+    def refresh(self):
+        """Rebuild the abbreviation index for the current time."""
+        now = datetime.datetime.utcnow()
+        utc_now = pytz.utc.localize(now)
+        tznames = {}
+        next_transition = None
+        for name in pytz.all_timezones:
+            tz = pytz.timezone(name)
+            abbr = utc_now.astimezone(tz).tzname()
+            try:
+                tznames[abbr].append(name)
+            except KeyError:
+                tznames[abbr] = [name,]
+            transitions = getattr(tz, '_utc_transition_times', None)
+            if transitions:
+                i = bisect_right(transitions, now)
+                if i < len(transitions):
+                    if not next_transition or transitions[i] < next_transition:
+                        next_transition = transitions[i]
+        self.abbreviations = tznames
+        self.abbreviation_index = FuzzyIndex(tznames)
+        self.next_transition = next_transition
+        self._cache.clear()
+
+    def _check_refresh(self):
+        if not self.next_transition:
+            return
+        if datetime.datetime.utcnow() >= self.next_transition:
+            self.refresh()
+
+    def timezone_names(self):
+        """Return current abbreviations mapped to a list of zones."""
+        self._check_refresh()
+        return self.abbreviations
+
+    def match(self, query):
+        """Return a list of ``(zone, score)`` tuples matching the query."""
+        self._check_refresh()
+        result = self._cache.get(query)
+        if result is not None:
+            self._cache.move_to_end(query)
+            return list(result)
+        result = self._match(query)
+        self._cache[query] = tuple(result)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+    def _match(self, query):
+        # try it as-is first
+        try:
+            pytz.timezone(query)
+            return [(query, 100),]
+        except pytz.UnknownTimeZoneError:
+            pass
+
+        # check if in tz names
+        if query.upper() in self.abbreviations:
+            return [(tz, 100) for tz in self.abbreviations[query.upper()]]
+
+        # fuzzymatch against all timezones as last resort
+        matches = self.abbreviation_index.matches(query, 80)
+
+        commontz_matches = self.common_index.matches(query, 90, True)
+
+        if commontz_matches:
+            matches.extend(commontz_matches)
+
+        fullmatches = [(tz, 100) for tz, s in matches if s == 100]
+        if len(fullmatches) == 1:
+            return fullmatches
+
+        return matches
@@ -8,6 +8,7 @@ from eevee import command, Cog, group
 
 LATEST_URL = "https://xkcd.com/info.0.json"
 ISSUE_URL = "https://xkcd.com/{comic_num}/info.0.json"
+UPDATE_BATCH_SIZE = 50
 
 
 class XKCD(Cog):
@@ -20,7 +21,8 @@ class XKCD(Cog):
 
     async def prepare_db(self):
         try:
-            await self.bot.dbi.execute_query("CREATE EXTENSION fuzzystrmatch;")
+            await self.bot.dbi.execute_query(
+                "CREATE EXTENSION fuzzystrmatch;", cache_statement=False)
         except asyncpg.DuplicateObjectError:
             pass
 
@@ -64,13 +66,16 @@ class XKCD(Cog):
             update_text = f"Pulling updates for comics {result} to {latest}."
             update_msg = await feedback_dest.send(update_text + f"\n{result}/{latest} done.")
 
+        insert = self.bot.dbi.insert('xkcd').primaries('id')
+        pending = 0
+
         for i in range(result+1, latest+1):
             data = await self.get_comic(i)
 
             if not data:
                 continue
 
-            self.table.insert.row(
+            insert.row(
                 id=int(data['num']),
                 img=data['img'],
                 title=data['title'],
@@ -82,8 +87,13 @@ class XKCD(Cog):
                 transcript=data['transcript'],
                 news=data['news']
             )
+            pending += 1
 
-            await self.table.insert.commit(do_update=False)
+            # write in batches rather than per comic
+            if pending >= UPDATE_BATCH_SIZE:
+                await insert.commit(do_update=False)
+                insert = self.bot.dbi.insert('xkcd').primaries('id')
+                pending = 0
 
             if feedback_dest:
                 last_change = update_msg.edited_at or update_msg.created_at
@@ -91,6 +101,9 @@ class XKCD(Cog):
                 if since_change.total_seconds() > 5:
                     await update_msg.edit(content=update_text + f"\n{data['num']}/{latest} done.")
 
+        if pending:
+            await insert.commit(do_update=False)
+
         if feedback_dest:
             await update_msg.edit(content=update_text + f"\n{latest}/{latest} done.")
             await feedback_dest.send(f"Updated Complete.")
@@ -23,9 +23,22 @@ db_details = {
     # 'username' : 'eevee',
     # 'database' : 'eevee',
     # 'hostname' : 'localhost',
+    # 'min_size' : 10,
+    # 'max_size' : 10,
+    # 'statement_cache_size' : 100,
+    # 'result_cache_size' : 256,
+    # 'copy_threshold' : 1000,
+    # 'partition_logs' : False,
+    # 'partition_interval' : 86400,
     'password' : 'password'
 }
 
+# file in the data directory to save image colours to, None to disable
+colour_cache_file = 'colour_cache.json'
+
+# compute pokemon and raid egg image colours in the background on startup
+prewarm_colours = False
+
 # default language
 lang_bot = 'en'
 lang_pkmn = 'en'
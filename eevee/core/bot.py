@@ -16,7 +16,8 @@ from discord.ext import commands
 from eevee import config
 from eevee.core.context import Context
 from eevee.core.data_manager import DatabaseInterface, DataManager
-from eevee.utils import ExitCodes, pagination, fuzzymatch, make_embed
+from eevee.utils import ExitCodes, pagination, fuzzymatch, formatters, make_embed
+from eevee.utils.assets import AssetCache
 
 
 class Eevee(commands.AutoShardedBot):
@@ -77,11 +78,21 @@ class Eevee(commands.AutoShardedBot):
         self.preload_ext = config.preload_extensions
         self.dbi = DatabaseInterface(**config.db_details)
         self.data = DataManager(self.dbi)
+        self.db_log_handlers = []
+        self._guild_index = None
         kwargs = dict(owner_id=self.owner,
                       command_prefix=self.prefix_manager,
                       status=discord.Status.dnd, **kwargs)
         super().__init__(**kwargs)
         self.session = aiohttp.ClientSession(loop=self.loop)
+        self.assets = AssetCache(
+            os.path.join(self.data_dir, 'assets'), session=self.session)
+        formatters.colour_cache.session = self.session
+        formatters.colour_cache.assets = self.assets
+        colour_cache_file = getattr(config, 'colour_cache_file', None)
+        if colour_cache_file:
+            formatters.colour_cache.set_path(
+                os.path.join(self.data_dir, colour_cache_file))
         self.loop.run_until_complete(self._db_connect())
         self.logger = logging.getLogger('eevee.Eevee')
 
@@ -149,6 +160,10 @@ class Eevee(commands.AutoShardedBot):
         else:
             self.shutdown_mode = ExitCodes.RESTART
         await self.logout()
+        await formatters.colour_cache.flush()
+        await self.assets.flush()
+        for handler in self.db_log_handlers:
+            await handler.close_queue()
         await self.dbi.stop()
 
     @cached_property
@@ -250,8 +265,10 @@ class Eevee(commands.AutoShardedBot):
         """A helper that searches for a guild by name."""
         result = self.get(self.guilds, name=name)
         if not result:
-            guild_list = (guild.name for guild in self.guilds)
-            result = self.match(guild_list, name)
+            if self._guild_index is None:
+                self._guild_index = fuzzymatch.FuzzyIndex(
+                    guild.name for guild in self.guilds)
+            result = self._guild_index.match(name)[0]
             if not result:
                 return None
             else:
@@ -288,6 +305,16 @@ class Eevee(commands.AutoShardedBot):
     async def on_command_completion(self, ctx):
         self.counter["processed_commands"] += 1
 
+    async def on_guild_join(self, guild):
+        self._guild_index = None
+
+    async def on_guild_remove(self, guild):
+        self._guild_index = None
+
+    async def on_guild_update(self, before, after):
+        if before.name != after.name:
+            self._guild_index = None
+
     async def on_connect(self):
         print("Connected.")
         await self.change_presence(status=discord.Status.idle)
@@ -301,6 +328,7 @@ class Eevee(commands.AutoShardedBot):
         print(f'Shard {shard_id} is ready.')
 
     async def on_ready(self):
+        self._guild_index = None
         intro = "Eevee - Pokemon Go Bot for Discord"
         intro_deco = "{0}\n{1}\n{0}".format('='*len(intro), intro)
         if not self.launch_time:
@@ -325,6 +353,10 @@ class Eevee(commands.AutoShardedBot):
             print("I'm not in any server yet, so be sure to invite me!")
         if self.invite_url:
             print(f"\nInvite URL: {self.invite_url}\n")
+        if self.dbi.timings:
+            timings = ', '.join(
+                f"{k} {v:.2f}s" for k, v in self.dbi.timings.items())
+            print(f"Database Startup: {timings}\n")
 
         if self.from_restart:
             table = self.dbi.table('restart_savedata')
@@ -1,5 +1,6 @@
 import importlib
 import logging
+import time
 
 from eevee.utils import Map
 
@@ -62,12 +63,27 @@ class Cog:
         if not isinstance(cog_tables, (list, tuple)):
             cog_tables = [cog_tables]
         self.tables = Map({t.name:t for t in cog_tables})
+        dbi = self.bot.dbi
+        start = time.perf_counter()
+        # look up all tables not in the cache in one catalog query
+        uncached = [t for t in self.tables.values()
+                    if t not in dbi.schema_cache]
+        if uncached:
+            await dbi.schema_cache.refresh(*uncached)
+        missing = []
         for table in self.tables.values():
-            if await table.exists():
+            if table in dbi.schema_cache:
                 self.logger.info(
                     f'Cog table {table.name} for {cog_name} found.')
                 table.new_columns = []
-                continue
-            await table.create()
-            self.logger.info(f'Cog table {table.name} for {cog_name} created.')
+            else:
+                missing.append(table)
+        if missing:
+            await dbi.create_tables(*missing)
+            for table in missing:
+                self.logger.info(
+                    f'Cog table {table.name} for {cog_name} created.')
+        # only the startup bootstrap is shown, not later cog reloads
+        if not self.bot.is_ready():
+            dbi.record_span('cog tables', start)
         del table_module
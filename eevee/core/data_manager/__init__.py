@@ -1,5 +1,6 @@
 from .manager import DataManager
 from .dbi import DatabaseInterface
 from .schema import Table
+from .writer import BufferedWriter
 from .errors import SchemaError
 from .tables import CogTable
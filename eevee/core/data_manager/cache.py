@@ -0,0 +1,234 @@
+import asyncio
+import time
+from collections import Counter, OrderedDict, namedtuple
+
+
+class ResultCache:
+    """Cache of query results keyed by SQL and args.
+
+    Entries expire after the TTL given with each query, and the least
+    recently used entries are evicted once more than ``max_entries`` are
+    cached. Concurrent calls for the same query share a single database
+    call. Writers invalidate all entries that read from a table with
+    :meth:`invalidate`.
+
+    Parameters
+    -----------
+    max_entries: :class:`int`
+        Maximum number of results to keep. Default is 256.
+
+    Attributes
+    -----------
+    stats: :class:`collections.Counter`
+        Counts of cache ``hits``, ``misses``, ``shared`` in-flight calls,
+        ``invalidations`` and ``evictions``.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.stats = Counter()
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._tables = {}
+        self._generations = Counter()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(query, args):
+        """Return a hashable key for the query, or ``None`` if impossible."""
+        key_args = tuple(
+            tuple(a) if isinstance(a, (list, set)) else a for a in args)
+        try:
+            hash(key_args)
+        except TypeError:
+            return None
+        return (query, key_args)
+
+    def _remove(self, key):
+        expires, tables, result = self._entries.pop(key)
+        for table in tables:
+            keys = self._tables.get(table)
+            if keys:
+                keys.discard(key)
+
+    def _store(self, key, tables, ttl, result):
+        self._entries[key] = (time.monotonic() + ttl, tables, result)
+        for table in tables:
+            self._tables.setdefault(table, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.stats['evictions'] += 1
+
+    async def get(self, key, tables, ttl, loader):
+        """Return the cached result for the key, loading it if required.
+
+        Parameters
+        -----------
+        key:
+            A key from :meth:`make_key`.
+        tables: :class:`list` of :class:`str`
+            Names of the tables the query reads from.
+        ttl: :class:`float`
+            Seconds to keep the result.
+        loader:
+            Coroutine function that runs the query.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry[2]
+            self._remove(key)
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.stats['shared'] += 1
+            return await asyncio.shield(inflight)
+
+        self.stats['misses'] += 1
+        tables = tuple(str(t) for t in tables)
+        generations = [self._generations[t] for t in tables]
+        future = asyncio.ensure_future(loader())
+        self._inflight[key] = future
+        try:
+            result = await asyncio.shield(future)
+        finally:
+            self._inflight.pop(key, None)
+
+        # skip saving if a writer changed data while the query ran
+        if generations == [self._generations[t] for t in tables]:
+            self._store(key, tables, ttl, result)
+        return result
+
+    def invalidate(self, *tables):
+        """Drop all cached results that read from any of the tables."""
+        for table in tables:
+            self._generations[str(table)] += 1
+            for key in self._tables.pop(str(table), ()):
+                if key in self._entries:
+                    self._remove(key)
+                    self.stats['invalidations'] += 1
+
+    def clear(self):
+        for table in self._tables:
+            self._generations[table] += 1
+        self._entries.clear()
+        self._tables.clear()
+
+
+# columns of all user tables with their position in the primary key
+SCHEMA_CATALOG_SQL = """
+SELECT c.*, k.ordinal_position AS primary_position
+FROM information_schema.columns c
+LEFT JOIN information_schema.table_constraints t
+    ON t.table_schema = c.table_schema
+    AND t.table_name = c.table_name
+    AND t.constraint_type = 'PRIMARY KEY'
+LEFT JOIN information_schema.key_column_usage k
+    ON k.constraint_schema = t.constraint_schema
+    AND k.constraint_name = t.constraint_name
+    AND k.column_name = c.column_name
+WHERE c.table_schema NOT IN ('pg_catalog', 'information_schema')
+    {}
+ORDER BY c.table_schema, c.table_name, c.ordinal_position;
+"""
+
+TableInfo = namedtuple('TableInfo', 'columns primaries info')
+
+
+class SchemaCache:
+    """Cache of the tables in the database with their columns and primary
+    keys.
+
+    All tables are loaded in one catalog query with :meth:`load`. Tables
+    not found in the cache are looked up individually, so tables created
+    outside of :meth:`Table.create` are still picked up.
+
+    Attributes
+    -----------
+    stats: :class:`collections.Counter`
+        Counts of cache ``hits``, ``misses`` and ``loads``.
+    """
+
+    def __init__(self, dbi):
+        self.dbi = dbi
+        self.stats = Counter()
+        self._tables = {}
+
+    def __len__(self):
+        return len(self._tables)
+
+    def __contains__(self, table):
+        return self.key(table) in self._tables
+
+    @staticmethod
+    def key(table):
+        """Return the ``(schema, name)`` key of a table or table name."""
+        schema = getattr(table, 'schema', None)
+        name = getattr(table, 'name', str(table))
+        if not schema and '.' in name:
+            schema, name = name.split('.', 1)
+        return (str(schema) if schema else 'public', name)
+
+    async def _query(self, *keys):
+        condition = ''
+        args = []
+        if keys:
+            condition = ("AND (c.table_schema, c.table_name) IN "
+                         "(SELECT * FROM unnest($1::text[], $2::text[]))")
+            args = [[k[0] for k in keys], [k[1] for k in keys]]
+        self.stats['loads'] += 1
+        rows = await self.dbi.execute_query(
+            SCHEMA_CATALOG_SQL.format(condition), *args)
+
+        found = {}
+        for row in rows:
+            key = (row['table_schema'], row['table_name'])
+            found.setdefault(key, []).append(row)
+        for key in keys:
+            self._tables.pop(key, None)
+        for key, info in found.items():
+            primaries = sorted(
+                (r for r in info if r['primary_position'] is not None),
+                key=lambda r: r['primary_position'])
+            self._tables[key] = TableInfo(
+                tuple(r['column_name'] for r in info),
+                tuple(r['column_name'] for r in primaries),
+                tuple(info))
+
+    async def load(self):
+        """Replace the cache with every table in the database."""
+        self._tables.clear()
+        await self._query()
+
+    async def refresh(self, *tables):
+        """Reload the details of the tables, such as after DDL."""
+        await self._query(*(self.key(t) for t in tables))
+
+    def discard(self, *tables):
+        """Remove the tables from the cache, such as after a drop."""
+        for table in tables:
+            self._tables.pop(self.key(table), None)
+
+    def clear(self):
+        self._tables.clear()
+
+    def get(self, table):
+        """Return the cached :class:`TableInfo` of a table, or ``None``."""
+        return self._tables.get(self.key(table))
+
+    async def fetch(self, table):
+        """Return the :class:`TableInfo` of a table, looking it up if it's
+        not cached. Returns ``None`` if the table doesn't exist.
+        """
+        key = self.key(table)
+        info = self._tables.get(key)
+        if info is not None:
+            self.stats['hits'] += 1
+            return info
+        self.stats['misses'] += 1
+        await self._query(key)
+        return self._tables.get(key)
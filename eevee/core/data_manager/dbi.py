@@ -1,16 +1,35 @@
+import asyncio
 import logging
 import json
+import time
+from datetime import datetime
+from functools import partial
 
 import asyncpg
 
 from discord.ext.commands import when_mentioned_or
 
-from .schema import Table, Query, Insert, Update, Schema
-from .tables import core_table_sqls
+from .cache import ResultCache, SchemaCache
+from .schema import Table, TableMeta, Query, Insert, Update, Schema
+from .tables import (core_table_sqls, core_table_backfills, core_index_sqls,
+                     partitioned_sql, partition_sqls, partition_months,
+                     default_partition_sql, move_default_sql,
+                     convert_partitioned_sql, PARTITION_KEYS)
+from .writer import BufferedWriter
 from . import sqltypes
 
 logger = logging.getLogger('eevee.dbi')
 
+# raised when a prepared statement is outdated by a schema change
+STALE_STATEMENT_ERRORS = (asyncpg.exceptions.InvalidCachedStatementError,
+                          asyncpg.exceptions.OutdatedSchemaCacheError)
+
+# statements run once with placeholder args on every pooled connection as
+# it opens, so asyncpg's statement cache of the connection holds them
+GUILD_SETTINGS_SQL = ('SELECT config_name, config_value FROM guild_config '
+                      'WHERE guild_id=$1;')
+CONN_STATEMENTS = ((GUILD_SETTINGS_SQL, (0,)),)
+
 async def init_conn(conn):
     await conn.set_type_codec(
         "jsonb", encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
@@ -25,96 +44,358 @@ class DatabaseInterface:
                  hostname='localhost',
                  username='eevee',
                  database="eevee",
-                 port=5432):
+                 port=5432,
+                 min_size=10,
+                 max_size=10,
+                 statement_cache_size=100,
+                 result_cache_size=256,
+                 copy_threshold=1000,
+                 partition_logs=False,
+                 partition_interval=86400):
         self.loop = None
         self.dsn = "postgres://{}:{}@{}:{}/{}".format(
             username, password, hostname, port, database)
         self.pool = None
-        self.settings_conn = None
-        self.settings_stmt = None
+        self.pool_options = dict(
+            min_size=min_size, max_size=max_size,
+            statement_cache_size=statement_cache_size)
         self.types = sqltypes
+        self.result_cache = ResultCache(result_cache_size)
+        self.schema_cache = SchemaCache(self)
+        self.copy_threshold = copy_threshold
+        self.partition_logs = partition_logs
+        self.partition_interval = partition_interval
+        self._partition_task = None
+        self.writer = BufferedWriter(self)
+        self._table_meta = {}
+        self.timings = {}
+        self._spans = {}
+
+    def record_timing(self, phase, start):
+        """Add the seconds since ``start`` to the timing of a startup
+        phase.
+        """
+        elapsed = time.perf_counter() - start
+        self.timings[phase] = self.timings.get(phase, 0) + elapsed
+
+    def record_span(self, phase, start):
+        """Time a phase run in concurrent parts, from the start of the
+        first part to the end of the last.
+        """
+        first, end = self._spans.get(phase, (start, 0))
+        first = min(first, start)
+        end = max(end, time.perf_counter())
+        self._spans[phase] = (first, end)
+        self.timings[phase] = end - first
 
     async def start(self, loop=None):
         if loop:
             self.loop = loop
-        self.pool = await asyncpg.create_pool(
-            self.dsn, loop=loop, init=init_conn)
+        start = time.perf_counter()
+        self.pool = await self._create_pool()
+        self.record_timing('pool', start)
         await self.prepare()
+        self.writer.start()
+        if self.partition_logs and not self._partition_task:
+            self._partition_task = asyncio.ensure_future(
+                self._maintain_partitions_loop())
 
     async def recreate_pool(self):
         logger.warning(f'Re-creating closed database pool.')
-        self.pool = await asyncpg.create_pool(
-            self.dsn, loop=self.loop, init=init_conn)
+        if self.pool:
+            self.pool.terminate()
+        self.pool = await self._create_pool()
+
+    def _pool_closed(self):
+        is_closing = getattr(self.pool, 'is_closing', None)
+        if is_closing:
+            return is_closing()
+        return self.pool._closed
+
+    async def _recover(self, error):
+        """Recreate the pool if an interface error was from it being closed,
+        otherwise re-raise the error.
+        """
+        if not self._pool_closed():
+            raise error
+        logger.error(f'Exception {type(error)}: {error}')
+        await self.recreate_pool()
+
+    async def _create_pool(self):
+        return await asyncpg.create_pool(
+            self.dsn, loop=self.loop, init=self._init_conn,
+            **self.pool_options)
+
+    async def _init_conn(self, conn):
+        await init_conn(conn)
+        for sql, args in CONN_STATEMENTS:
+            try:
+                await conn.fetch(sql, *args)
+            except asyncpg.UndefinedTableError:
+                # core tables not created yet, prepare on first use instead
+                pass
 
     async def prepare(self):
+        start = time.perf_counter()
+        await self.schema_cache.load()
+        self.record_timing('schema', start)
         # ensure tables exists
         await self.core_tables_exist()
 
-        # guild settings statement
-        self.settings_conn = await self.pool.acquire()
-        settings_sql = ('SELECT config_value FROM guild_config '
-                        'WHERE guild_id=$1 AND config_name=$2;')
-        self.settings_stmt = await self.settings_conn.prepare(settings_sql)
-
     async def core_tables_exist(self):
+        """Create any missing core tables in a single transaction, then
+        run the migrations.
+        """
+        start = time.perf_counter()
         core_sql = core_table_sqls()
-        for k, v in core_sql.items():
-            table_exists = await self.table(k).exists()
-            if not table_exists:
-                logger.warning(f'Core table {k} not found. Creating...')
-                await self.execute_transaction(v)
-                logger.warning(f'Core table {k} created.')
+        backfills = core_table_backfills()
+        missing = [k for k in core_sql if k not in self.schema_cache]
+        if missing:
+            logger.warning(
+                f'Core tables {", ".join(missing)} not found. Creating...')
+            sqls = []
+            for k in missing:
+                v = core_sql[k]
+                if self.partition_logs and k in PARTITION_KEYS:
+                    v = partitioned_sql(v, PARTITION_KEYS[k])
+                sqls.append(v.rstrip().rstrip(';'))
+            await self.execute_script(';\n'.join(sqls))
+            for k in missing:
+                if k in backfills:
+                    await self.execute_script(backfills[k])
+            await self.schema_cache.refresh(*missing)
+            logger.warning(f'Core tables {", ".join(missing)} created.')
+        self.record_timing('core tables', start)
+        start = time.perf_counter()
+        await self.migrate()
+        self.record_timing('migrations', start)
+
+    async def migrate(self):
+        """Bring existing core tables up to date with the current schema."""
+        if self.partition_logs:
+            await self.convert_partitioned()
+        for sql in core_index_sqls():
+            await self.execute_query(sql, cache_statement=False)
+        await self.maintain_partitions()
+
+    async def _partition_kinds(self):
+        rows = await self.execute_query(
+            "SELECT relname, relkind FROM pg_class "
+            "WHERE relname = any($1::text[]) "
+            "AND relnamespace = 'public'::regnamespace "
+            "AND relkind IN ('r', 'p');",
+            list(PARTITION_KEYS), cache_statement=False)
+        return {r['relname']: r['relkind'] for r in rows}
+
+    async def convert_partitioned(self):
+        """Convert existing unpartitioned core tables to be partitioned.
+
+        Each table is renamed, recreated as partitioned and has its rows
+        copied across in a single transaction. This rewrites the whole
+        table, so may take a while for large tables.
+        """
+        kinds = await self._partition_kinds()
+        for table, kind in kinds.items():
+            if kind != 'r':
+                continue
+            table_info = await self.schema_cache.fetch(table)
+            script = convert_partitioned_sql(table, table_info.columns)
+            logger.warning(f'Converting {table} to a partitioned table...')
+            try:
+                await self.execute_script(script)
+            except asyncpg.PostgresError as e:
+                logger.error(
+                    f'{table} not converted to a partitioned table: {e}. '
+                    f'It can be converted manually with:\n{script}')
+                continue
+            await self.schema_cache.refresh(table)
+            logger.warning(f'{table} converted to a partitioned table.')
+
+    async def maintain_partitions(self):
+        """Create upcoming monthly partitions for partitioned core tables.
+
+        Rows that were saved to the default partition because their month
+        had no partition yet are moved into new monthly partitions.
+        """
+        kinds = await self._partition_kinds()
+        for table, kind in kinds.items():
+            if kind != 'p':
+                if self.partition_logs:
+                    logger.warning(f'{table} is not partitioned.')
+                continue
+            column = PARTITION_KEYS[table]
+            try:
+                await self.execute_query(
+                    default_partition_sql(table), cache_statement=False)
+                oldest = await self.execute_query(
+                    f"SELECT min({column}) FROM {table}_default;",
+                    cache_statement=False)
+                oldest = oldest[0][0]
+                last_upper = list(partition_months())[-1][2]
+                if oldest is None or oldest >= last_upper:
+                    for sql in partition_sqls(table):
+                        await self.execute_query(sql, cache_statement=False)
+                    continue
+                start = min(datetime.utcnow(), datetime.utcfromtimestamp(oldest))
+                await self.execute_script(
+                    move_default_sql(table, column, start=start))
+                logger.warning(
+                    f'Moved rows in {table}_default to monthly partitions.')
+            except asyncpg.PostgresError as e:
+                logger.error(f'Partitions for {table} not created: {e}')
+            self.result_cache.invalidate(table)
+
+    async def _maintain_partitions_loop(self):
+        while True:
+            await asyncio.sleep(self.partition_interval)
+            try:
+                await self.maintain_partitions()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(type(e).__name__, exc_info=e)
+
+    async def rebuild_table(self, name):
+        """Refill a derived core table from the tables it summarises."""
+        backfill = core_table_backfills()[name]
+        await self.execute_script(f"DELETE FROM {name}; {backfill}")
+        self.result_cache.invalidate(name)
 
     async def stop(self):
-        conns = (self.settings_conn,)
-        for c in conns:
-            if c:
-                await self.pool.release(c)
+        if self._partition_task:
+            self._partition_task.cancel()
+            self._partition_task = None
+        await self.writer.close()
         if self.pool:
             await self.pool.close()
             self.pool.terminate()
 
-    async def execute_query(self, query, *query_args):
+    async def execute_query(self, query, *query_args, cache_statement=True):
+        """Run a query and return the resulting records.
+
+        Statements are kept in asyncpg's statement cache of each connection
+        unless ``cache_statement`` is ``False``, which should be used for
+        one-off statements such as DDL.
+        """
         result = []
         try:
             async with self.pool.acquire() as conn:
-                stmt = await conn.prepare(query)
-                rcrds = await stmt.fetch(*query_args)
+                if cache_statement:
+                    rcrds = await conn.fetch(query, *query_args)
+                else:
+                    stmt = await conn.prepare(query)
+                    rcrds = await stmt.fetch(*query_args)
                 for rcrd in rcrds:
                     result.append(rcrd)
             return result
+        except STALE_STATEMENT_ERRORS:
+            # asyncpg has dropped the outdated statement, so prepare again
+            return await self.execute_query(
+                query, *query_args, cache_statement=cache_statement)
         except asyncpg.exceptions.InterfaceError as e:
-            logger.error(f'Exception {type(e)}: {e}')
-            await self.recreate_pool()
-            return await self.execute_query(query, *query_args)
+            await self._recover(e)
+            return await self.execute_query(
+                query, *query_args, cache_statement=cache_statement)
 
-    async def execute_transaction(self, query, *query_args):
+    async def execute_transaction(self, query, *query_args,
+                                  cache_statement=True):
+        """Run a query inside a transaction and return the resulting records.
+
+        Passing tuples or sets as args runs the query once per arg set.
+        See :meth:`execute_query` for ``cache_statement``.
+        """
         result = []
         try:
             async with self.pool.acquire() as conn:
-                stmt = await conn.prepare(query)
+                # one-off statements are prepared only for this acquire
+                if cache_statement:
+                    cursor = partial(conn.cursor, query)
+                else:
+                    cursor = (await conn.prepare(query)).cursor
 
                 if any(isinstance(x, (set, tuple)) for x in query_args):
                     async with conn.transaction():
                         for query_arg in query_args:
-                            async for rcrd in stmt.cursor(*query_arg):
+                            async for rcrd in cursor(*query_arg):
                                 result.append(rcrd)
                 else:
                     async with conn.transaction():
-                        async for rcrd in stmt.cursor(*query_args):
+                        async for rcrd in cursor(*query_args):
                             result.append(rcrd)
                 return result
-        except asyncpg.exceptions.InterfaceError:
-            await self.recreate_pool()
-            return await self.execute_transaction(query, *query_args)
+        except STALE_STATEMENT_ERRORS:
+            return await self.execute_transaction(
+                query, *query_args, cache_statement=cache_statement)
+        except asyncpg.exceptions.InterfaceError as e:
+            await self._recover(e)
+            return await self.execute_transaction(
+                query, *query_args, cache_statement=cache_statement)
+
+    async def execute_many(self, query, args):
+        try:
+            async with self.pool.acquire() as conn:
+                await conn.executemany(query, args)
+        except asyncpg.exceptions.InterfaceError as e:
+            await self._recover(e)
+            return await self.execute_many(query, args)
+
+    async def copy_records(self, table, columns, records):
+        schema, __, name = table.rpartition('.')
+        try:
+            async with self.pool.acquire() as conn:
+                return await conn.copy_records_to_table(
+                    name, records=records, columns=columns,
+                    schema_name=schema or None)
+        except asyncpg.exceptions.InterfaceError as e:
+            await self._recover(e)
+            return await self.copy_records(table, columns, records)
+
+    async def execute_script(self, script):
+        """Run SQL commands that take no args in a single transaction."""
+        try:
+            async with self.pool.acquire() as conn:
+                async with conn.transaction():
+                    return await conn.execute(script)
+        except asyncpg.exceptions.InterfaceError as e:
+            await self._recover(e)
+            return await self.execute_script(script)
+
+    async def guild_settings(self, guild_id):
+        """Return the config name and value records for a guild."""
+        return await self.execute_query(GUILD_SETTINGS_SQL, guild_id)
 
     async def create_table(self, name, columns: list, *, primaries=None):
         """Create table."""
-        return await Table(self, name).create(columns, primaries=primaries)
+        return await Table(name, self).create(columns, primaries=primaries)
 
     def table(self, name):
         return Table(name, self)
 
+    async def create_tables(self, *tables):
+        """Create tables from their ``new_columns`` in a single transaction.
+
+        Tables are created in the order given, so tables referenced by a
+        foreign key must come before the tables referencing them.
+        """
+        schemas = {str(t.schema): t.schema for t in tables if t.schema}
+        for schema in schemas.values():
+            await schema.create()
+        await self.execute_script(';\n'.join(t.sql() for t in tables))
+        await self.schema_cache.refresh(*tables)
+        for table in tables:
+            if table.initial_data:
+                await table.insert.rows(table.initial_data).commit(
+                    do_update=False)
+        return tables
+
+    def table_meta(self, name, schema=None):
+        """Return the shared :class:`TableMeta` for a table name."""
+        key = (name, str(schema) if schema else None)
+        meta = self._table_meta.get(key)
+        if meta is None:
+            meta = self._table_meta[key] = TableMeta.parse(self, name, schema)
+        return meta
+
     def query(self, *tables):
         return Query(self, *tables)
 
@@ -124,6 +405,15 @@ class DatabaseInterface:
     def update(self, table):
         return Update(self, table)
 
+    def compile(self, builder, *args, **kwargs):
+        """Compile a query, insert or update builder into a reusable
+        :class:`CompiledStatement`.
+
+        Extra args are passed to the builder's ``compile`` method, such as
+        ``do_update`` for inserts.
+        """
+        return builder.compile(*args, **kwargs)
+
     async def tables(self):
         table = self.table('information_schema.tables')
         table.query('table_name')
@@ -1,32 +1,170 @@
+import asyncio
+import time
+from collections import Counter, OrderedDict
+
 import discord
 
+class GuildSettingsCache:
+    """Cache of guild settings with write-through updates.
+
+    All settings for a guild are loaded in a single query on first access.
+    Loaded guilds expire after ``ttl`` seconds and the least recently used
+    guilds are evicted once more than ``max_guilds`` are cached. Concurrent
+    loads of a guild share a single query, and a load that finishes after a
+    write to the same guild isn't stored.
+
+    Parameters
+    -----------
+    dbi: :class:`eevee.core.data_manager.dbi.DatabaseInterface`
+        The interface used to load and save settings.
+    ttl: :class:`float`
+        Seconds before a guild's settings are reloaded. Default is 300.
+    max_guilds: :class:`int`
+        Maximum number of guilds to keep cached. Default is 1000.
+
+    Attributes
+    -----------
+    stats: :class:`collections.Counter`
+        Counts of cache ``hits``, ``misses``, ``shared`` in-flight loads,
+        ``expired`` and ``evictions``.
+    """
+
+    def __init__(self, dbi, *, ttl=300, max_guilds=1000):
+        self.dbi = dbi
+        self.ttl = ttl
+        self.max_guilds = max_guilds
+        self.stats = Counter()
+        self._guilds = OrderedDict()
+        self._inflight = {}
+        self._generations = Counter()
+        self._set_stmt = None
+
+    def __len__(self):
+        return len(self._guilds)
+
+    @property
+    def hit_rate(self):
+        """:class:`float` : Ratio of lookups answered from the cache."""
+        lookups = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / lookups if lookups else 0.0
+
+    def _cached(self, guild_id):
+        entry = self._guilds.get(guild_id)
+        if entry is None:
+            return None
+        expires, settings = entry
+        if expires < time.monotonic():
+            del self._guilds[guild_id]
+            self.stats['expired'] += 1
+            return None
+        self._guilds.move_to_end(guild_id)
+        return settings
+
+    def _store(self, guild_id, settings):
+        self._guilds[guild_id] = (time.monotonic() + self.ttl, settings)
+        self._guilds.move_to_end(guild_id)
+        while len(self._guilds) > self.max_guilds:
+            self._guilds.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    async def _query(self, guild_id):
+        rows = await self.dbi.guild_settings(guild_id)
+        return {r['config_name']: r['config_value'] for r in rows}
+
+    async def _load(self, guild_id):
+        future = self._inflight.get(guild_id)
+        if future is not None:
+            self.stats['shared'] += 1
+            return dict(await asyncio.shield(future))
+
+        generation = self._generations[guild_id]
+        future = asyncio.ensure_future(self._query(guild_id))
+        self._inflight[guild_id] = future
+        try:
+            settings = await asyncio.shield(future)
+        finally:
+            self._inflight.pop(guild_id, None)
+
+        # skip saving if the guild was written to while loading
+        if generation == self._generations[guild_id]:
+            self._store(guild_id, settings)
+        return settings
+
+    async def get_all(self, guild_id):
+        """Return a dict of all settings for a guild."""
+        settings = self._cached(guild_id)
+        if settings is not None:
+            self.stats['hits'] += 1
+            return settings
+        self.stats['misses'] += 1
+        return await self._load(guild_id)
+
+    async def get(self, guild_id, key):
+        """Return the value of a setting, or ``None`` if not set."""
+        settings = await self.get_all(guild_id)
+        return settings.get(key)
+
+    async def set(self, guild_id, key, value):
+        """Save a setting to the database and cache."""
+        if not self._set_stmt:
+            insert = self.dbi.insert('guild_config')
+            insert.set_columns('guild_id', 'config_name', 'config_value')
+            insert.primaries('guild_id', 'config_name')
+            self._set_stmt = self.dbi.compile(insert, do_update=True)
+        result = await self._set_stmt.execute(guild_id, key, value)
+        self._generations[guild_id] += 1
+        settings = self._cached(guild_id)
+        if settings is not None:
+            settings[key] = value
+        return result
+
+    async def delete(self, guild_id, key):
+        """Remove a setting from the database and cache."""
+        config_table = self.dbi.table('guild_config')
+        query = config_table.query.where(guild_id=guild_id, config_name=key)
+        result = await query.delete()
+        self._generations[guild_id] += 1
+        settings = self._cached(guild_id)
+        if settings is not None:
+            settings.pop(key, None)
+        return result
+
+    def invalidate(self, guild_id=None):
+        """Drop a guild from the cache, or all guilds if none is given."""
+        if guild_id is None:
+            for key in {*self._guilds, *self._inflight}:
+                self._generations[key] += 1
+            self._guilds.clear()
+        else:
+            self._generations[guild_id] += 1
+            self._guilds.pop(guild_id, None)
+
 class GuildDM:
     """Manage guild data/settings."""
 
-    def __init__(self, dbi, guild):
+    def __init__(self, dbi, guild, settings_cache=None):
         self.dbi = dbi
         if isinstance(guild, discord.Guild):
             guild = guild.id
         self.guild_id = int(guild)
+        if settings_cache is None:
+            settings_cache = GuildSettingsCache(dbi)
+        self.settings_cache = settings_cache
 
     async def settings(self, key=None, value=None, *, delete=False):
-        config_table = self.dbi.table('guild_config')
+        cache = self.settings_cache
         if delete:
             if key:
-                return await config_table.delete(
-                    guild_id=self.guild_id, config_name=str(key))
+                return await cache.delete(self.guild_id, str(key))
             else:
                 return None
         if key is not None:
             if value is not None:
-                return await config_table.upsert(
-                    guild_id=self.guild_id,
-                    config_name=str(key), config_value=str(value))
+                return await cache.set(self.guild_id, str(key), str(value))
             else:
-                return await self.dbi.settings_stmt.fetchval(
-                    self.guild_id, str(key))
+                return await cache.get(self.guild_id, str(key))
         else:
-            return await config_table.get(guild_id=self.guild_id)
+            return dict(await cache.get_all(self.guild_id))
 
     async def prefix(self, new_prefix: str = None):
         """Add, remove and change custom guild prefix.
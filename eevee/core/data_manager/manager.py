@@ -1,11 +1,12 @@
-from .guild import GuildDM
+from .guild import GuildDM, GuildSettingsCache
 
 class DataManager:
     """Query and data handling"""
 
     def __init__(self, db):
         self._db = db
+        self.settings_cache = GuildSettingsCache(db)
 
     def guild(self, guild_id):
         """Guild Data Manager"""
-        return GuildDM(self._db, guild_id)
+        return GuildDM(self._db, guild_id, self.settings_cache)
@@ -1,9 +1,15 @@
+from collections import namedtuple
+from copy import copy
+from functools import partial
 from itertools import zip_longest, chain
 from more_itertools import partition
 
 from .errors import PostgresError, SchemaError, ResponseError, QueryError
 from . import sqltypes
 
+# postgres limit on bind parameters in a single statement
+MAX_QUERY_ARGS = 32767
+
 class SQLOperator:
 
     default_template = '{column} {operator} {value}'
@@ -305,7 +311,8 @@ class Schema:
         sql = "DROP SCHEMA $1"
         if cascade:
             sql += " CASCADE"
-        return await self.dbi.execute_transaction(sql, self.name)
+        return await self.dbi.execute_transaction(
+            sql, self.name, cache_statement=False)
 
     def sql(self, skip_if_exists=True):
         if skip_if_exists:
@@ -316,7 +323,7 @@ class Schema:
 
     async def create(self, skip_if_exists=True):
         sql, value = self.sql(skip_if_exists)
-        await self.dbi.execute_transaction(sql, value)
+        await self.dbi.execute_transaction(sql, value, cache_statement=False)
         return self
 
 class TableColumns:
@@ -332,53 +339,96 @@ class TableColumns:
         return [Column(name, table=self._table) for name in column_names]
 
     async def info(self, *names):
-        metatable = Table('information_schema.columns', self._dbi)
-        metatable.query.where(TABLE_NAME=self._table.name)
+        """Return the ``information_schema.columns`` records of the table,
+        with an added ``primary_position`` field.
+        """
+        table_info = await self._dbi.schema_cache.fetch(self._table)
+        if not table_info:
+            return []
         if names:
-            metatable.query.where(metatable['COLUMN_NAME'].in_(names))
-        print(metatable.query.sql())
-        return await metatable.query.get()
+            return [r for r in table_info.info if r['column_name'] in names]
+        return list(table_info.info)
 
     async def get_names(self):
-        metatable = Table('information_schema.columns', self._dbi)
-        metatable.query('column_name')
-        metatable.query.where(TABLE_NAME=self._table.name)
-        return await metatable.query.get_values()
+        table_info = await self._dbi.schema_cache.fetch(self._table)
+        return list(table_info.columns) if table_info else []
 
     async def get_primaries(self):
-        kcu = Table('information_schema.key_column_usage', self._dbi)
-        query = kcu.query('column_name').where(
-            table_name=self._table.name,
-            constraint_name=f"{self._table.name}_pkey")
-        return await query.get_values()
+        table_info = await self._dbi.schema_cache.fetch(self._table)
+        return list(table_info.primaries) if table_info else []
 
-class Table:
-    """Represents a database table."""
+class TableMeta(namedtuple('TableMeta', 'name schema full_name')):
+    """Immutable name details of a table, shared between instances."""
 
-    __slots__ = ('name', 'dbi', 'columns', 'where', 'new_columns',
-                 'query', 'insert', 'update', 'initial_data', 'schema')
+    __slots__ = ()
 
-    def __init__(self, name: str, dbi, *, schema=None):
+    @classmethod
+    def parse(cls, dbi, name, schema=None):
         if '.' in name and not schema:
             schema, name = name.split('.', 1)
+        if isinstance(schema, str):
             schema = Schema(dbi, schema)
-        self.name = name
-        if schema:
-            if isinstance(schema, str):
-                schema = Schema(dbi, schema)
-        self.schema = schema
+        full_name = f"{schema}.{name}" if schema else name
+        return cls(name, schema, full_name)
+
+class Table:
+    """Represents a database table.
+
+    The column interface and the query, insert and update builders are
+    only created when first used.
+    """
+
+    __slots__ = ('name', 'dbi', 'new_columns', 'initial_data', 'schema',
+                 '_meta', '_columns', '_where', '_query', '_insert',
+                 '_update')
+
+    def __init__(self, name: str, dbi, *, schema=None):
+        meta = dbi.table_meta(name, schema)
+        self._meta = meta
+        self.name = meta.name
+        self.schema = meta.schema
         self.dbi = dbi
-        self.where = SQLConditions(parent=self)
-        self.columns = TableColumns(table=self)
         self.new_columns = []
         self.initial_data = []
-        self.query = Query(dbi, self)
-        self.insert = Insert(dbi, self)
-        self.update = Update(dbi, self)
+        self._columns = None
+        self._where = None
+        self._query = None
+        self._insert = None
+        self._update = None
+
+    @property
+    def columns(self):
+        if self._columns is None:
+            self._columns = TableColumns(table=self)
+        return self._columns
+
+    @property
+    def where(self):
+        if self._where is None:
+            self._where = SQLConditions(parent=self)
+        return self._where
+
+    @property
+    def query(self):
+        if self._query is None:
+            self._query = Query(self.dbi, self)
+        return self._query
+
+    @property
+    def insert(self):
+        if self._insert is None:
+            self._insert = Insert(self.dbi, self)
+        return self._insert
+
+    @property
+    def update(self):
+        if self._update is None:
+            self._update = Update(self.dbi, self)
+        return self._update
 
     @property
     def full_name(self):
-        return f"{self.schema}.{self.name}" if self.schema else self.name
+        return self._meta.full_name
 
     def __str__(self):
         return self.full_name
@@ -395,11 +445,11 @@ class Table:
         return False
 
     def sql(self, *columns, primaries=None):
-        """Generate SQL for creating the table."""
+        """Generate SQL for creating the table.
+
+        The schema of the table isn't included and must already exist.
+        """
         sql = []
-        if self.schema:
-            sql.append(str(self.schema.sql()))
-            sql.append('\n')
         sql.append(f"CREATE TABLE {self.full_name} (")
         if not columns:
             if not self.new_columns:
@@ -421,36 +471,24 @@ class Table:
         """Create table and return the object representing it."""
         if self.schema:
             await self.schema.create()
-        sql = f"CREATE TABLE {self.full_name} ("
-        if not columns:
-            if not self.new_columns:
-                raise SchemaError("No columns for created table.")
-            columns = self.new_columns
-        sql += ', '.join(col.to_sql for col in columns)
-        if not primaries:
-            primaries = [col.name for col in columns if col.primary_key]
-        if primaries:
-            if isinstance(primaries, str):
-                sql += f", CONSTRAINT {self.name}_pkey PRIMARY KEY ({primaries})"
-            elif isinstance(primaries, (list, tuple, set)):
-                sql += (f", CONSTRAINT {self.name}_pkey"
-                        f" PRIMARY KEY ({', '.join(primaries)})")
-        sql += ")"
-        await self.dbi.execute_transaction(sql)
+        sql = self.sql(*columns, primaries=primaries)
+        await self.dbi.execute_transaction(sql, cache_statement=False)
+        await self.dbi.schema_cache.refresh(self)
         if self.initial_data:
             await self.insert.rows(self.initial_data).commit(do_update=False)
         return self
 
     async def exists(self):
-        """Create table and return the object representing it."""
-        sql = f"SELECT to_regclass('{self.full_name}')"
-        result = await self.dbi.execute_query(sql)
-        return bool(list(result[0])[0])
+        """Return ``True`` if the table exists in the database."""
+        return bool(await self.dbi.schema_cache.fetch(self))
 
     async def drop(self):
         """Drop table from database."""
-        sql = f"DROP TABLE $1"
-        return await self.dbi.execute_transaction(sql, (self.full_name,))
+        sql = f"DROP TABLE {self.full_name}"
+        result = await self.dbi.execute_transaction(sql, cache_statement=False)
+        self.dbi.schema_cache.discard(self)
+        self.dbi.result_cache.invalidate(self)
+        return result
 
     async def get_constraints(self):
         """Get column from table."""
@@ -467,6 +505,7 @@ class SQLConditions:
         self.where_conditions = []
         self.having_conditions = []
         self.values = []
+        self.names = []
         self.add = self.add_having if allow_having else self.add_conditions
         self._count_token = 0
 
@@ -474,6 +513,8 @@ class SQLConditions:
         self.where_conditions = []
         self.having_conditions = []
         self.values = []
+        self.names = []
+        self._count_token = 0
         return self
 
     def sort_conditions(self, *conditions, allow_having=True):
@@ -525,11 +566,14 @@ class SQLConditions:
                     else:
                         data.update(value=f"${self._count}")
                         self.values.append(condition.value)
+                        self.names.append(str(condition._column))
                 else:
                     data.update(minvalue=f"${self._count}")
                     self.values.append(condition.minvalue)
+                    self.names.append(f"{condition._column}_min")
                     data.update(maxvalue=f"${self._count}")
                     self.values.append(condition.maxvalue)
+                    self.names.append(f"{condition._column}_max")
                 condition_strings.append(condition.format(**data))
             return condition_strings
         cond_list.extend(make_string(*conditions))
@@ -569,6 +613,7 @@ class Query:
             self.table(*tables)
         self._limit = None
         self._offset = None
+        self._cache_ttl = None
         self.conditions = SQLConditions(parent=self)
         self.where = self.conditions.add_conditions
         self.having = self.conditions.add_having
@@ -638,6 +683,16 @@ class Query:
         self._offset = number
         return self
 
+    def cached(self, ttl=60):
+        """Cache the results of this query for ``ttl`` seconds.
+
+        Identical queries share results until they expire or a write to
+        one of the queried tables is committed through a builder. Pass
+        ``None`` to stop caching.
+        """
+        self._cache_ttl = ttl
+        return self
+
     def sql(self, delete=False):
         sql = []
         if delete:
@@ -667,14 +722,34 @@ class Query:
             sql.append(f"OFFSET {self._offset}")
         return (f"{' '.join(sql)};", self.conditions.values)
 
+    def compile(self, delete=False):
+        """Return a :class:`CompiledStatement` of this query's shape.
+
+        Condition values are replaced by the values given on execution, in
+        the order the conditions were added.
+        """
+        sql, __ = self.sql(delete=delete)
+        return CompiledStatement(
+            self._dbi, sql, self.conditions.names, self._from, write=delete)
+
     async def delete(self, **conditions):
         if conditions:
             self.conditions.add_conditions(**conditions)
         query, args = self.sql(delete=True)
-        return await self._dbi.execute_query(query, *args)
+        result = await self._dbi.execute_query(query, *args)
+        self._dbi.result_cache.invalidate(*self._from)
+        return result
 
     async def get(self):
         query, args = self.sql()
+        if self._cache_ttl:
+            cache = self._dbi.result_cache
+            key = cache.make_key(query, args)
+            if key is not None:
+                loader = partial(self._dbi.execute_query, query, *args)
+                result = await cache.get(
+                    key, self._from, self._cache_ttl, loader)
+                return list(result)
         return await self._dbi.execute_query(query, *args)
 
     async def get_one(self):
@@ -757,6 +832,12 @@ class Insert:
             duplicate is encountered.
         """
 
+        cols, data = self._sorted_data()
+        return (self._build_sql(cols, do_update), tuple(data))
+
+    def _sorted_data(self):
+        """Return the columns and row values sorted in the same order."""
+
         # get columns
         cols = self._columns or set(chain.from_iterable(self._data))
 
@@ -765,8 +846,10 @@ class Insert:
             for entry in self._data:
                 entry.update((k, None) for k in cols - entry.keys())
 
-        # order columns and build column indexes
-        col_idx, cols = zip(*[(f"${i+1}", c) for i, c in enumerate(cols)])
+        # order columns
+        cols = tuple(cols)
+        if not cols:
+            raise SchemaError('No columns given for Insert.')
 
         # sort all data entries into in same order of columns
         data = []
@@ -774,9 +857,21 @@ class Insert:
             entry_values = tuple(entry[d] for d in cols)
             data.append(entry_values)
 
+        return (cols, data)
+
+    def _build_sql(self, cols, do_update=None, row_count=1):
+        """Build the insert statement for a number of rows of columns."""
+
+        # build column indexes for each row
+        width = len(cols)
+        rows_idx = []
+        for row in range(row_count):
+            idx_str = ', '.join(f"${row*width+i+1}" for i in range(width))
+            rows_idx.append(f"({idx_str})")
+
         # build the insert statement
-        col_str, idx_str = (', '.join(cols), ', '.join(col_idx))
-        sql = f"INSERT INTO {self._from} ({col_str}) VALUES ({idx_str})"
+        col_str, idx_str = (', '.join(cols), ', '.join(rows_idx))
+        sql = f"INSERT INTO {self._from} ({col_str}) VALUES {idx_str}"
 
         # handle conflict if required
         if do_update:
@@ -793,7 +888,29 @@ class Insert:
         if self._returning:
             sql += f" RETURNING {', '.join(self._returning)}"
 
-        return (sql, tuple(data))
+        return sql
+
+    def compile(self, do_update=None):
+        """Return a :class:`CompiledStatement` inserting one row.
+
+        Values are given on execution in the order of the declared columns,
+        or of the keys of the first row added if none were declared.
+        Primaries not declared are taken from the schema cache.
+        """
+        if not self._from:
+            raise SchemaError('A table must be declared.')
+        cols = self._columns or (tuple(self._data[0]) if self._data else ())
+        if not cols:
+            raise SchemaError('No columns given for Insert.')
+        if do_update is not None and not self._primaries:
+            table_info = self._dbi.schema_cache.get(self._from)
+            if table_info and table_info.primaries:
+                self._primaries = table_info.primaries
+            else:
+                raise SchemaError('Primaries must be declared to compile an '
+                                  'Insert that handles conflicts.')
+        sql = self._build_sql(tuple(cols), do_update)
+        return CompiledStatement(self._dbi, sql, cols, [self._from])
 
     def sql_test(self, do_update=None):
         """SQL test output"""
@@ -802,9 +919,17 @@ class Insert:
         msg = f"**SQL**```sql\n{sql}\n```\n**Data**```py\n{data_str}\n```"
         return msg
 
-    async def commit(self, do_update=None):
+    async def commit(self, do_update=None, *, copy_threshold=None):
         """Commit the data in the current insert session to the database.
 
+        Multiple rows are written in bulk. Upserts are sent as multi-row
+        ``VALUES`` statements, plain inserts of at least ``copy_threshold``
+        rows are sent with ``COPY`` and other batches use ``executemany``.
+        Inserts with a ``RETURNING`` clause are committed row by row.
+
+        Returns a :class:`list` of the records returned by the insert, which
+        is empty unless ``RETURNING`` columns were given.
+
         Parameters:
         -----------
         do_update: :class:`bool`
@@ -814,13 +939,55 @@ class Insert:
             already.
             `False` suppresses the exception and just does nothing when a
             duplicate is encountered.
+        copy_threshold: :class:`int`
+            Minimum rows for a plain insert to use ``COPY``. Defaults to the
+            ``copy_threshold`` of the database interface.
         """
         if not self._from:
             raise SchemaError('A table must be declared.')
         if not do_update is None and not self._primaries:
             self._primaries = await self._from.columns.get_primaries()
-        sql, data = self.sql(do_update)
-        return await self._dbi.execute_transaction(sql, *data)
+        if len(self._data) > 1 and not self._returning:
+            result = await self._commit_bulk(do_update, copy_threshold)
+        else:
+            sql, data = self.sql(do_update)
+            result = await self._dbi.execute_transaction(sql, *data)
+        self._dbi.result_cache.invalidate(self._from)
+        return result
+
+    async def _commit_bulk(self, do_update, copy_threshold):
+        cols, data = self._sorted_data()
+        if copy_threshold is None:
+            copy_threshold = self._dbi.copy_threshold
+
+        if do_update is None:
+            if len(data) >= copy_threshold:
+                await self._dbi.copy_records(str(self._from), cols, data)
+            else:
+                await self._dbi.execute_many(self._build_sql(cols), data)
+            # no RETURNING on bulk inserts, so no records to return
+            return []
+
+        # a row can only be updated once per statement, so keep the last
+        # entry for each set of primary key values
+        if do_update and set(self._primaries).issubset(cols):
+            key_idx = [cols.index(c) for c in self._primaries]
+            unique = {tuple(row[i] for i in key_idx): row for row in data}
+            data = list(unique.values())
+
+        # split into statements within the bind parameter limit
+        chunk_size = MAX_QUERY_ARGS // len(cols)
+        results = []
+        for i in range(0, len(data), chunk_size):
+            chunk = data[i:i+chunk_size]
+            sql = self._build_sql(cols, do_update, len(chunk))
+            args = list(chain.from_iterable(chunk))
+            # run as a single statement, as execute_transaction would treat
+            # tuple values, such as arrays, as separate sets of args. Row
+            # counts vary, so don't fill the statement cache with them.
+            results.extend(await self._dbi.execute_query(
+                sql, *args, cache_statement=False))
+        return results
 
     def set_columns(self, *columns):
         """Declares the columns for positional arg data entry."""
@@ -981,6 +1148,24 @@ class Update:
 
         return (' '.join(sql), tuple(data))
 
+    def compile(self, allow_no_condition=False):
+        """Return a :class:`CompiledStatement` of this update's shape.
+
+        Values are given on execution with the condition values first, then
+        the new column values.
+        """
+        if not self._columns and not self._data:
+            raise SchemaError('No columns given for Update.')
+        cols = tuple(self._columns or
+                     dict.fromkeys(chain.from_iterable(self._data)))
+        # build from a copy so this builder's data is left unchanged
+        template = copy(self)
+        template._columns = cols
+        template._data = [dict.fromkeys(cols)]
+        sql, __ = template.sql(allow_no_condition)
+        params = list(self.conditions.names) + list(cols)
+        return CompiledStatement(self._dbi, sql, params, [self._from])
+
     def sql_test(self, allow_no_condition=False):
         """SQL test output"""
         sql, data = self.sql(allow_no_condition)
@@ -992,6 +1177,7 @@ class Update:
         """Commit the data in the current update session to the database."""
         sql, data = self.sql(allow_no_condition)
         await self._dbi.execute_transaction(sql, *data)
+        self._dbi.result_cache.invalidate(self._from)
 
     def columns(self, *columns):
         if not columns:
@@ -1047,3 +1233,71 @@ class Update:
             self.values(**kwargs)
 
         return self
+
+class CompiledStatement:
+    """A statement with fixed SQL that can be run with new values.
+
+    Built once from a :class:`Query`, :class:`Insert` or :class:`Update`
+    with :meth:`DatabaseInterface.compile`, so repeated statements of the
+    same shape skip the builders entirely.
+
+    Values are given either positionally in the order of :attr:`params`, or
+    by parameter name when all names are unique.
+
+    Attributes
+    -----------
+    sql: :class:`str`
+        The SQL of the statement.
+    params: :class:`tuple` of :class:`str`
+        Names of the values the statement takes, in order.
+    """
+
+    __slots__ = ('_dbi', 'sql', 'params', '_tables', '_write')
+
+    def __init__(self, dbi, sql, params, tables, write=True):
+        self._dbi = dbi
+        self.sql = sql
+        self.params = tuple(params)
+        self._tables = tuple(tables)
+        self._write = write
+
+    def __repr__(self):
+        return f"<CompiledStatement sql={self.sql!r} params={self.params}>"
+
+    def args(self, *values, **named_values):
+        """Return the values in statement order."""
+        if named_values:
+            if values:
+                raise SyntaxError(
+                    'Unable to mix positional args and kwargs for a '
+                    'compiled statement.')
+            if len(set(self.params)) != len(self.params):
+                raise SyntaxError(
+                    'Statement has repeated parameter names, so values '
+                    'must be given positionally.')
+            try:
+                values = tuple(named_values[name] for name in self.params)
+            except KeyError as e:
+                raise SyntaxError(f'Missing value for {e.args[0]}.')
+            if len(named_values) > len(self.params):
+                raise SyntaxError('Unexpected values given.')
+        if len(values) != len(self.params):
+            raise SyntaxError(
+                f'Expected {len(self.params)} values, got {len(values)}.')
+        return values
+
+    async def execute(self, *values, **named_values):
+        """Run the statement with the values and return the records."""
+        args = self.args(*values, **named_values)
+        result = await self._dbi.execute_query(self.sql, *args)
+        if self._write:
+            self._dbi.result_cache.invalidate(*self._tables)
+        return result
+
+    async def execute_many(self, rows):
+        """Run the statement once for each row of values."""
+        rows = [self.args(**row) if isinstance(row, dict) else self.args(*row)
+                for row in rows]
+        await self._dbi.execute_many(self.sql, rows)
+        if self._write:
+            self._dbi.result_cache.invalidate(*self._tables)
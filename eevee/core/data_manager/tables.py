@@ -1,6 +1,15 @@
+from datetime import datetime, timezone
+
 from eevee.core.data_manager import schema
 from eevee.core.logger import LOGGERS
 
+# high volume core tables and the column they can be range partitioned on
+PARTITION_KEYS = {
+    'discord_messages' : 'sent',
+    'member_activity'  : 'time',
+    'command_log'      : 'sent',
+}
+
 def core_table_sqls():
     sql_dict = {
         'guild_config' : ("CREATE TABLE guild_config ("
@@ -32,6 +41,14 @@ def core_table_sqls():
                               "CONSTRAINT discord_messages_pkey "
                               "PRIMARY KEY (message_id, sent));"),
 
+        'message_activity' : ("CREATE TABLE message_activity ("
+                              "guild_id bigint NOT NULL, "
+                              "author_id bigint NOT NULL, "
+                              "hour_start bigint NOT NULL, "
+                              "message_count bigint NOT NULL DEFAULT 0, "
+                              "CONSTRAINT message_activity_pkey "
+                              "PRIMARY KEY (guild_id, author_id, hour_start));"),
+
         'member_activity'  : ("CREATE TABLE member_activity ("
                               "member_id bigint NOT NULL, "
                               "time bigint NOT NULL, "
@@ -78,6 +95,108 @@ def core_table_sqls():
 
     return sql_dict
 
+def core_index_sqls():
+    """SQL for secondary indexes on core tables, safe to run repeatedly."""
+    index_sqls = [
+        # covered by the primary key
+        "DROP INDEX IF EXISTS discord_messages_message_id_idx;",
+        ("CREATE INDEX IF NOT EXISTS discord_messages_guild_author_idx "
+         "ON discord_messages (guild_id, author_id, sent) "
+         "WHERE is_edit = FALSE;"),
+        ("CREATE INDEX IF NOT EXISTS command_log_guild_idx "
+         "ON command_log (guild_id, sent);"),
+        ("CREATE INDEX IF NOT EXISTS command_log_author_idx "
+         "ON command_log (author_id, sent);"),
+        ("CREATE INDEX IF NOT EXISTS member_activity_guild_idx "
+         "ON member_activity (guild_id, time);"),
+    ]
+
+    for log in LOGGERS:
+        index_sqls.append(f"CREATE INDEX IF NOT EXISTS {log}_created_idx "
+                          f"ON {log} (created);")
+
+    return index_sqls
+
+def partitioned_sql(table_sql, column):
+    """Convert a create table statement to be range partitioned."""
+    return table_sql.rstrip(';') + f" PARTITION BY RANGE ({column});"
+
+def partition_months(start=None, months_ahead=2):
+    """Yield the name suffix and epoch bounds of each month from the start
+    month up to ``months_ahead`` months after the current month.
+    """
+    now = datetime.utcnow()
+    start = start or now
+    first = start.year * 12 + start.month - 1
+    last = now.year * 12 + now.month - 1 + months_ahead
+    for idx in range(first, last + 1):
+        year, month = divmod(idx, 12)
+        next_year, next_month = divmod(idx + 1, 12)
+        lower = datetime(year, month + 1, 1, tzinfo=timezone.utc)
+        upper = datetime(next_year, next_month + 1, 1, tzinfo=timezone.utc)
+        yield (f"{year}_{month + 1:02}",
+               int(lower.timestamp()), int(upper.timestamp()))
+
+def default_partition_sql(table):
+    return (f"CREATE TABLE IF NOT EXISTS {table}_default "
+            f"PARTITION OF {table} DEFAULT;")
+
+def partition_sqls(table, months_ahead=2, start=None):
+    """SQL to create monthly partitions from the start month onwards."""
+    return [f"CREATE TABLE IF NOT EXISTS {table}_{suffix} "
+            f"PARTITION OF {table} FOR VALUES FROM ({lower}) TO ({upper});"
+            for suffix, lower, upper in partition_months(start, months_ahead)]
+
+def move_default_sql(table, column, months_ahead=2, start=None):
+    """SQL to create monthly partitions for rows held in the default
+    partition, moving the rows into them.
+
+    Postgres can't create a partition while the default partition holds
+    rows in its range, so the default is detached until the rows are
+    moved. Run it as a single transaction.
+    """
+    months = list(partition_months(start, months_ahead))
+    lower, upper = months[0][1], months[-1][2]
+    return '\n'.join([
+        f"ALTER TABLE {table} DETACH PARTITION {table}_default;",
+        *partition_sqls(table, months_ahead, start),
+        f"WITH moved AS (DELETE FROM {table}_default "
+        f"WHERE {column} >= {lower} AND {column} < {upper} RETURNING *) "
+        f"INSERT INTO {table} SELECT * FROM moved;",
+        f"ALTER TABLE {table} ATTACH PARTITION {table}_default DEFAULT;",
+    ])
+
+def convert_partitioned_sql(table, columns):
+    """SQL to convert an existing core table to be range partitioned.
+
+    The table is renamed, recreated as partitioned with a default partition
+    and its rows copied across. Run it as a single transaction, then run
+    :func:`move_default_sql` to split the rows into monthly partitions.
+    """
+    old = f"{table}_unpartitioned"
+    create_sql = partitioned_sql(core_table_sqls()[table], PARTITION_KEYS[table])
+    cols = ', '.join(columns)
+    return '\n'.join([
+        f"ALTER TABLE {table} RENAME TO {old};",
+        f"ALTER TABLE {old} RENAME CONSTRAINT {table}_pkey TO {old}_pkey;",
+        create_sql,
+        default_partition_sql(table),
+        f"INSERT INTO {table} ({cols}) SELECT {cols} FROM {old};",
+        f"DROP TABLE {old};",
+    ])
+
+def core_table_backfills():
+    """SQL to fill derived core tables from the tables they summarise."""
+    return {
+        'message_activity' : ("INSERT INTO message_activity "
+                              "(guild_id, author_id, hour_start, message_count) "
+                              "SELECT guild_id, author_id, "
+                              "sent - sent % 3600, count(*) "
+                              "FROM discord_messages "
+                              "WHERE is_edit = FALSE AND guild_id IS NOT NULL "
+                              "GROUP BY 1, 2, 3;")
+    }
+
 
 class CogTable:
     table_config = {
@@ -0,0 +1,323 @@
+import asyncio
+import logging
+from collections import Counter, OrderedDict
+
+import asyncpg
+
+logger = logging.getLogger('eevee.dbi.writer')
+
+
+class BufferedWriter:
+    """Write-behind buffer for batching high volume inserts.
+
+    Rows are grouped by table, column order and conflict handling, then
+    written in bulk once ``batch_size`` rows are waiting or ``interval``
+    seconds have passed since the last flush.
+
+    No more than ``max_rows`` rows are held waiting for a flush. When the
+    buffer is full, producers wait on a flush before their row is accepted.
+
+    Plain inserts are written with ``COPY``, while inserts that handle
+    conflicts are written with ``executemany``. Counter increments are
+    summed in memory and added to the stored counts when flushed. Counts
+    that fail to write are added to ``stats['count_drift']``, and a derived
+    table like ``message_activity`` should then be rebuilt from its source
+    table with :meth:`DatabaseInterface.rebuild_table`. Updates
+    setting the same values are merged into one statement matching all
+    their keys, and are written after the inserts.
+
+    Parameters
+    -----------
+    dbi: :class:`eevee.core.data_manager.dbi.DatabaseInterface`
+        The interface used to write the buffered rows.
+    max_rows: :class:`int`
+        Maximum number of rows waiting to be written. Default is 5000.
+    batch_size: :class:`int`
+        Number of waiting rows that triggers an early flush. Default is 500.
+    interval: :class:`float`
+        Seconds between timed flushes. Default is 5.
+    """
+
+    def __init__(self, dbi, *, max_rows=5000, batch_size=500, interval=5.0):
+        self.dbi = dbi
+        self.max_rows = max_rows
+        self.batch_size = batch_size
+        self.interval = interval
+        self.stats = Counter()
+        self._buffers = OrderedDict()
+        self._row_counts = {}
+        self._counters = OrderedDict()
+        self._updates = OrderedDict()
+        self._statements = {}
+        self._pending = 0
+        self._lock = None
+        self._wake = None
+        self._task = None
+
+    @property
+    def pending(self):
+        """:class:`int` : Number of rows waiting to be written."""
+        return self._pending
+
+    def start(self):
+        """Start the background flush task."""
+        if self._task:
+            return
+        self._lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._task = asyncio.ensure_future(self._run())
+
+    async def close(self):
+        """Stop the background flush task and write any waiting rows."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._lock:
+            await self.flush()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def add(self, table, *, conflict=None, primaries=None, counts=(),
+                  **row):
+        """Buffer a row to be inserted into a table.
+
+        Parameters
+        -----------
+        table: :class:`str`
+            Name of the table to insert the row into.
+        conflict: :class:`bool`
+            Same as ``do_update`` in :meth:`Insert.commit`.
+        primaries: :class:`tuple` of :class:`str`
+            Conflict target columns, required if ``conflict`` is set.
+        counts: iterable of :class:`tuple`
+            ``(table, column, keys)`` increments, as given to
+            :meth:`increment`, to make only once the row is written. They
+            are skipped if the row fails to write or is a duplicate.
+        **row
+            Column names with their values.
+        """
+        if self._pending >= self.max_rows:
+            self.stats['backpressure'] += 1
+            await self.flush()
+        key = (table, tuple(row), conflict, tuple(primaries or ()))
+        rows = self._buffers.setdefault(key, [])
+        if counts:
+            self._row_counts.setdefault(key, {})[len(rows)] = tuple(counts)
+        rows.append(tuple(row.values()))
+        self._pending += 1
+        self.stats['queued'] += 1
+        if self._pending >= self.batch_size and self._wake:
+            self._wake.set()
+
+    async def increment(self, table, column, amount=1, **keys):
+        """Buffer an increment of a counter column in a table.
+
+        Increments for the same keys are summed before being written.
+
+        Parameters
+        -----------
+        table: :class:`str`
+            Name of the table holding the counter.
+        column: :class:`str`
+            Name of the counter column.
+        amount: :class:`int`
+            Amount to add to the counter. Default is 1.
+        **keys
+            Primary key column names with their values.
+        """
+        counts = self._counters.get((table, tuple(keys), column))
+        if counts is None or tuple(keys.values()) not in counts:
+            if self._pending >= self.max_rows:
+                self.stats['backpressure'] += 1
+                await self.flush()
+        self._count(table, column, amount, keys)
+
+    def _count(self, table, column, amount, keys):
+        counts = self._counters.setdefault(
+            (table, tuple(keys), column), Counter())
+        key_values = tuple(keys.values())
+        if key_values not in counts:
+            self._pending += 1
+        counts[key_values] += amount
+        self.stats['increments'] += 1
+
+    async def update(self, table, key_column, keys, **values):
+        """Buffer an update of the rows matching any of the keys.
+
+        Parameters
+        -----------
+        table: :class:`str`
+            Name of the table to update.
+        key_column: :class:`str`
+            Name of the column to match the keys against.
+        keys: iterable
+            Values of ``key_column`` for the rows to update.
+        **values
+            Column names with their new values.
+        """
+        group = (table, key_column, tuple(values.items()))
+        for key in keys:
+            if self._pending >= self.max_rows:
+                self.stats['backpressure'] += 1
+                await self.flush()
+            pending = self._updates.setdefault(group, set())
+            if key not in pending:
+                pending.add(key)
+                self._pending += 1
+            self.stats['updates'] += 1
+        if self._pending >= self.batch_size and self._wake:
+            self._wake.set()
+
+    async def flush(self):
+        """Write all waiting rows to the database.
+
+        Cached query results of the tables written to are invalidated.
+        """
+        if not self._lock:
+            return
+        async with self._lock:
+            await self._flush()
+
+    async def paused(self, func, *args):
+        """Write all waiting rows, then await ``func(*args)`` with flushes
+        paused until it returns.
+
+        Use this for work that must not overlap a flush, such as rebuilding
+        a table the writer adds counts to.
+        """
+        if not self._lock:
+            return await func(*args)
+        async with self._lock:
+            await self._flush()
+            return await func(*args)
+
+    async def _flush(self):
+        buffers, self._buffers = self._buffers, OrderedDict()
+        row_counts, self._row_counts = self._row_counts, {}
+        updates, self._updates = self._updates, OrderedDict()
+        self._pending -= sum(len(rows) for rows in buffers.values())
+        self._pending -= sum(len(keys) for keys in updates.values())
+        written = set()
+        try:
+            for key, rows in buffers.items():
+                if await self._write(key, rows, row_counts.get(key)):
+                    written.add(key[0])
+            # taken after the rows, to include the counts of rows written
+            counters, self._counters = self._counters, OrderedDict()
+            self._pending -= sum(len(counts) for counts in counters.values())
+            for key, counts in counters.items():
+                if await self._write_counts(key, counts):
+                    written.add(key[0])
+            for key, keys in updates.items():
+                if await self._write_update(key, keys):
+                    written.add(key[0])
+        finally:
+            if written:
+                self.dbi.result_cache.invalidate(*written)
+
+    def _statement(self, key):
+        stmt = self._statements.get(key)
+        if stmt is None:
+            table, columns, conflict, primaries = key
+            insert = self.dbi.insert(table).set_columns(*columns)
+            if primaries:
+                insert.primaries(*primaries)
+            stmt = self.dbi.compile(insert, do_update=conflict)
+            self._statements[key] = stmt
+        return stmt
+
+    async def _write(self, key, rows, row_counts=None):
+        table, columns, conflict, primaries = key
+        written = range(len(rows))
+        try:
+            if conflict is None:
+                try:
+                    await self.dbi.copy_records(table, columns, rows)
+                except asyncpg.UniqueViolationError:
+                    # a duplicate fails the whole copy, so skip just those
+                    self.stats['copy_fallbacks'] += 1
+                    written = await self._write_skipping_duplicates(
+                        key, rows, row_counts)
+            else:
+                await self.dbi.execute_many(self._statement(key).sql, rows)
+        except (asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+            self.stats['dropped'] += len(rows)
+            logger.exception(
+                f'Dropped {len(rows)} buffered rows for {table}.', exc_info=e)
+            return False
+        self.stats['written'] += len(written)
+        self.stats['batches'] += 1
+        if row_counts:
+            for idx in written:
+                for count_table, column, keys in row_counts.get(idx, ()):
+                    self._count(count_table, column, 1, keys)
+        return True
+
+    async def _write_skipping_duplicates(self, key, rows, row_counts):
+        """Insert rows ignoring duplicates, returning the indexes of the
+        rows written.
+        """
+        sql = f"{self._statement(key).sql} ON CONFLICT DO NOTHING"
+        if not row_counts:
+            await self.dbi.execute_many(sql, rows)
+            return range(len(rows))
+        # find which rows were new, so their counts can be kept
+        written = []
+        for idx, row in enumerate(rows):
+            if await self.dbi.execute_query(f"{sql} RETURNING 1", *row):
+                written.append(idx)
+        self.stats['duplicates'] += len(rows) - len(written)
+        return written
+
+    async def _write_counts(self, key, counts):
+        table, key_cols, column = key
+        cols = key_cols + (column,)
+        idx_str = ', '.join(f"${i+1}" for i in range(len(cols)))
+        sql = (f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({idx_str}) "
+               f"ON CONFLICT ({', '.join(key_cols)}) DO UPDATE "
+               f"SET {column} = {table}.{column} + excluded.{column}")
+        rows = [key_values + (n,) for key_values, n in counts.items()]
+        try:
+            await self.dbi.execute_many(sql, rows)
+        except (asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+            self.stats['dropped'] += len(rows)
+            self.stats['count_failures'] += 1
+            self.stats['count_drift'] += sum(counts.values())
+            logger.exception(
+                f'Dropped {len(rows)} buffered counts for {table}. '
+                f'Rebuild {table} to recount them.',
+                exc_info=e)
+            return False
+        self.stats['written'] += len(rows)
+        self.stats['batches'] += 1
+        return True
+
+    async def _write_update(self, group, keys):
+        table, key_column, values = group
+        set_str = ', '.join(
+            f"{column} = ${i+1}" for i, (column, __) in enumerate(values))
+        sql = (f"UPDATE {table} SET {set_str} "
+               f"WHERE {key_column} = any(${len(values)+1})")
+        args = [value for __, value in values]
+        try:
+            await self.dbi.execute_query(sql, *args, list(keys))
+        except (asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+            self.stats['dropped'] += len(keys)
+            logger.exception(
+                f'Dropped {len(keys)} buffered updates for {table}.',
+                exc_info=e)
+            return False
+        self.stats['written'] += len(keys)
+        self.stats['batches'] += 1
+        return True
@@ -5,10 +5,10 @@ import sys
 import time
 import traceback
 import logging
+from collections import Counter, deque
 from logging import handlers
 from datetime import timezone
 
-import asyncpg
 import discord
 
 from eevee.utils import snowflake
@@ -76,27 +76,97 @@ def init_logger(bot, debug_flag=False):
     eevee_log.addHandler(eevee_db)
     discord_db = DBLogHandler(bot, 'discord_logs')
     discord_log.addHandler(discord_db)
+    bot.db_log_handlers = [eevee_db, discord_db]
 
     bot.add_cog(ActivityLogging(bot))
 
     return eevee_log
 
 class DBLogHandler(logging.Handler):
-    def __init__(self, bot, log_name: str, level=logging.INFO):
+    """Log handler that saves records to a database table.
+
+    Records are held in a bounded queue and written in batches by a single
+    consumer task. When the queue is full, the oldest records are dropped
+    to make room and counted in ``stats['dropped']``.
+
+    Parameters
+    -----------
+    bot: :class:`eevee.core.bot.Eevee`
+        Current instance of Eevee
+    log_name: :class:`str`
+        The log table to save records to.
+    level: :class:`int`
+        Minimum level of records to save. Default is ``logging.INFO``.
+    max_queue: :class:`int`
+        Maximum number of records waiting to be saved. Default is 1000.
+    batch_size: :class:`int`
+        Maximum number of records saved per insert. Default is 100.
+    interval: :class:`float`
+        Seconds between saves when the queue isn't filling quickly.
+        Default is 2.
+    """
+    def __init__(self, bot, log_name: str, level=logging.INFO, *,
+                 max_queue=1000, batch_size=100, interval=2.0):
         if log_name not in LOGGERS:
             raise RuntimeError(f'Unknown Log Name: {log_name}')
         self.bot = bot
         self.log_name = log_name
         self.logger = module_logger.getChild('DBLogHandler')
+        self.queue = deque(maxlen=max_queue)
+        self.batch_size = batch_size
+        self.interval = interval
+        self.stats = Counter()
+        self._wake = None
+        self._task = bot.loop.create_task(self.consume())
         super().__init__(level=level)
 
     def emit(self, record):
-        record_id = next(get_id)
-        asyncio.run_coroutine_threadsafe(
-            self.submit_log(record_id, record), self.bot.loop)
-
-    async def submit_log(self, log_id, record):
-        data = dict(log_id=log_id,
+        # failures saving logs would otherwise feed back into the queue
+        if record.name == self.logger.name:
+            return
+        if len(self.queue) == self.queue.maxlen:
+            self.stats['dropped'] += 1
+        self.queue.append((next(get_id), record))
+        self.stats['queued'] += 1
+        if len(self.queue) >= self.batch_size and self._wake:
+            loop = self.bot.loop
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(self._wake.set)
+
+    async def consume(self):
+        self._wake = asyncio.Event()
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.submit_logs()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # keep consuming so a bad batch can't stop db logging
+                self.logger.exception(type(e).__name__, exc_info=e)
+
+    async def close_queue(self):
+        """Stop the consumer task and save any queued records."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.submit_logs()
+
+    @staticmethod
+    def record_data(log_id, record):
+        if record.exc_info:
+            tb = ''.join(traceback.format_exception(*record.exc_info))
+        else:
+            tb = ''
+        return dict(log_id=log_id,
                     created=record.created,
                     logger_name=str(record.name),
                     level_name=str(record.levelname),
@@ -104,19 +174,30 @@ class DBLogHandler(logging.Handler):
                     module=str(record.module),
                     func_name=str(record.funcName),
                     line_no=record.lineno,
-                    message=str(record.message),
-                    traceback=''.join(
-                        traceback.format_exception(*record.exc_info)))
-        try:
-            table = self.bot.dbi.table(self.log_name)
-            table.insert(**data)
-            await table.insert.commit()
-        except asyncpg.PostgresError as e:
-            self.logger.exception(type(e).__name__, exc_info=e)
+                    message=str(record.getMessage()),
+                    traceback=tb)
+
+    async def submit_logs(self):
+        while self.queue:
+            batch = []
+            while self.queue and len(batch) < self.batch_size:
+                batch.append(self.queue.popleft())
+            try:
+                rows = [self.record_data(*item) for item in batch]
+                insert = self.bot.dbi.insert(self.log_name)
+                await insert.rows(rows).commit()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats['failed'] += len(batch)
+                self.logger.exception(type(e).__name__, exc_info=e)
+            else:
+                self.stats['written'] += len(batch)
 
 class ActivityLogging:
     def __init__(self, bot):
         self.bot = bot
+        self.writer = bot.dbi.writer
         self.logger = module_logger.getChild('ActivityLogging')
 
     async def on_message(self, msg):
@@ -129,32 +210,34 @@ class ActivityLogging:
                     guild_id=guild_id, content=msg.content,
                     clean_content=msg.clean_content, embeds=embeds,
                     webhook_id=msg.webhook_id, attachments=attachments)
-        try:
-            table = self.bot.dbi.table('discord_messages')
-            table.insert(**data)
-            await table.insert.commit()
-        except asyncpg.PostgresError as e:
-            self.logger.exception(type(e).__name__, exc_info=e)
+        counts = ()
+        if guild_id:
+            # only counted once the message is saved, so duplicates aren't
+            keys = dict(guild_id=guild_id, author_id=msg.author.id,
+                        hour_start=sent - sent % 3600)
+            counts = (('message_activity', 'message_count', keys),)
+        await self.writer.add('discord_messages', counts=counts, **data)
+
+    async def rebuild_activity(self):
+        """Recount the message activity rollup from the message log.
+
+        Use this to recover from counts lost to write errors, shown by the
+        writer's ``count_drift`` stat.
+        """
+        # write out buffered messages and counts first, and hold further
+        # flushes so none are counted twice or lost during the rebuild
+        await self.writer.paused(
+            self.bot.dbi.rebuild_table, 'message_activity')
 
     async def on_raw_message_delete(self, payload):
-        try:
-            table = self.bot.dbi.table('discord_messages')
-            table.update(deleted=True)
-            table.update.where(message_id=payload.message_id)
-            await table.update.commit()
-        except asyncpg.PostgresError as e:
-            self.logger.exception(type(e).__name__, exc_info=e)
+        await self.writer.update(
+            'discord_messages', 'message_id', [payload.message_id],
+            deleted=True)
 
     async def on_raw_bulk_message_delete(self, payload):
-        try:
-            table = self.bot.dbi.table('discord_messages')
-            table.update(deleted=True)
-            m_ids = payload.message_ids
-            conditions = [table['message_id'] == m_id for m_id in m_ids]
-            table.update.where(conditions)
-            await table.update.commit()
-        except asyncpg.PostgresError as e:
-            self.logger.exception(type(e).__name__, exc_info=e)
+        await self.writer.update(
+            'discord_messages', 'message_id', payload.message_ids,
+            deleted=True)
 
     async def on_message_edit(self, before, after):
         if before.type == discord.MessageType.call:
@@ -171,14 +254,10 @@ class ActivityLogging:
                     guild_id=guild_id, content=msg.content,
                     clean_content=msg.clean_content, embeds=embeds,
                     webhook_id=msg.webhook_id, attachments=attachments)
-        try:
-            table = self.bot.dbi.table('discord_messages')
-            table.insert(**data)
-            # update existing data
-            table.insert.primaries('message_id', 'sent')
-            await table.insert.commit(do_update=True)
-        except asyncpg.PostgresError as e:
-            self.logger.exception(type(e).__name__, exc_info=e)
+        # update existing data
+        await self.writer.add(
+            'discord_messages', conflict=True,
+            primaries=('message_id', 'sent'), **data)
 
     async def on_command(self, ctx):
         created = ctx.message.created_at
@@ -194,14 +273,10 @@ class ActivityLogging:
                     invoked_subcommand=isc,
                     subcommand_passed=ctx.subcommand_passed,
                     command_failed=ctx.command_failed, cog=cog)
-        try:
-            table = self.bot.dbi.table('command_log')
-            table.insert(**data)
-            table.insert.primaries('message_id', 'sent')
-            # ignore conflicts
-            await table.insert.commit(do_update=False)
-        except asyncpg.PostgresError as e:
-            self.logger.exception(type(e).__name__, exc_info=e)
+        # ignore conflicts
+        await self.writer.add(
+            'command_log', conflict=False,
+            primaries=('message_id', 'sent'), **data)
 
     async def on_member_update(self, before, after):
         status_update = None
@@ -225,11 +300,7 @@ class ActivityLogging:
                     status=status_update, from_status=status_from,
                     guild_id=guild, display_name=name_update)
 
-        try:
-            table = self.bot.dbi.table('member_activity')
-            table.insert(**data)
-            table.insert.primaries('member_id', 'time')
-            # ignore conflicts
-            await table.insert.commit(do_update=False)
-        except asyncpg.PostgresError as e:
-            self.logger.exception(type(e).__name__, exc_info=e)
+        # ignore conflicts
+        await self.writer.add(
+            'member_activity', conflict=False,
+            primaries=('member_id', 'time'), **data)
@@ -1,4 +1,4 @@
 from .formatters import make_embed, url_color, user_color, cleanup_code, bitround
-from .fuzzymatch import get_match
+from .fuzzymatch import get_match, FuzzyIndex
 from .enums import ExitCodes
 from .datatypes import Map
@@ -0,0 +1,187 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import Counter
+
+import aiohttp
+from async_timeout import timeout
+
+logger = logging.getLogger('eevee.utils.assets')
+
+
+class AssetCache:
+    """Local cache of downloaded assets such as sprites.
+
+    Files are stored under their content hash, with an index of URLs to
+    hashes and validators. Entries older than ``max_age`` are revalidated
+    with ``If-None-Match`` and ``If-Modified-Since`` before use. If the
+    upstream server fails or is too slow, the stored copy is used instead.
+    Concurrent requests for the same URL share one download, and changes to
+    the index are saved together after a short delay.
+
+    Parameters
+    -----------
+    path: :class:`str`
+        Directory to keep the assets in.
+    session: :class:`aiohttp.ClientSession`, optional
+        Session used to download assets. A temporary session is used for
+        each download if not set.
+    max_age: :class:`float`
+        Seconds before a stored asset is revalidated. Default is 86400.
+    request_timeout: :class:`float`
+        Seconds to wait on the upstream server. Default is 10.
+    save_delay: :class:`float`
+        Seconds to wait before saving the index after a change, so that
+        assets fetched together are saved together. Default is 5.
+
+    Attributes
+    -----------
+    stats: :class:`collections.Counter`
+        Counts of ``hits``, ``revalidated``, ``downloaded`` and ``stale``
+        assets served.
+    """
+
+    def __init__(self, path, *, session=None, max_age=86400,
+                 request_timeout=10, save_delay=5.0):
+        self.path = path
+        self.session = session
+        self.max_age = max_age
+        self.request_timeout = request_timeout
+        self.save_delay = save_delay
+        self.stats = Counter()
+        self._index_path = os.path.join(path, 'index.json')
+        self._inflight = {}
+        self._index = {}
+        self._save_task = None
+        self._save_lock = None
+        os.makedirs(path, exist_ok=True)
+        try:
+            with open(self._index_path) as fp:
+                self._index = json.load(fp)
+        except (OSError, ValueError):
+            pass
+
+    def __len__(self):
+        return len(self._index)
+
+    def _file_path(self, digest):
+        return os.path.join(self.path, digest)
+
+    def _read_file(self, digest):
+        try:
+            with open(self._file_path(digest), 'rb') as fp:
+                return fp.read()
+        except OSError:
+            return None
+
+    def _write_file(self, digest, data):
+        file_path = self._file_path(digest)
+        if not os.path.exists(file_path):
+            tmp_path = f"{file_path}.tmp"
+            with open(tmp_path, 'wb') as fp:
+                fp.write(data)
+            os.replace(tmp_path, file_path)
+
+    def save(self, index=None):
+        """Write the index of stored assets to disk."""
+        index = self._index if index is None else index
+        tmp_path = f"{self._index_path}.tmp"
+        with open(tmp_path, 'w') as fp:
+            json.dump(index, fp)
+        os.replace(tmp_path, self._index_path)
+
+    async def _save_later(self):
+        await asyncio.sleep(self.save_delay)
+        self._save_task = None
+        if self._save_lock is None:
+            self._save_lock = asyncio.Lock()
+        loop = asyncio.get_event_loop()
+        async with self._save_lock:
+            await loop.run_in_executor(None, self.save, dict(self._index))
+
+    async def flush(self):
+        """Save an index waiting on a debounced save straight away."""
+        if not self._save_task:
+            return
+        self._save_task.cancel()
+        self._save_task = None
+        if self._save_lock is None:
+            self._save_lock = asyncio.Lock()
+        loop = asyncio.get_event_loop()
+        async with self._save_lock:
+            await loop.run_in_executor(None, self.save, dict(self._index))
+
+    async def _request(self, session, url, headers):
+        async with timeout(self.request_timeout):
+            async with session.get(url, headers=headers) as resp:
+                if resp.status == 304:
+                    return resp.status, resp.headers, None
+                resp.raise_for_status()
+                return resp.status, resp.headers, await resp.read()
+
+    async def _fetch(self, url, entry, stored):
+        headers = {}
+        if entry and stored is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        if self.session and not self.session.closed:
+            return await self._request(self.session, url, headers)
+        async with aiohttp.ClientSession() as session:
+            return await self._request(session, url, headers)
+
+    async def _load(self, url):
+        loop = asyncio.get_event_loop()
+        entry = self._index.get(url)
+        stored = None
+        if entry:
+            stored = await loop.run_in_executor(
+                None, self._read_file, entry['hash'])
+            if stored is not None:
+                if time.time() - entry['checked'] < self.max_age:
+                    self.stats['hits'] += 1
+                    return stored
+
+        try:
+            status, headers, data = await self._fetch(url, entry, stored)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if stored is None:
+                raise
+            logger.warning(f'Using stored copy of {url}: {e!r}')
+            self.stats['stale'] += 1
+            return stored
+
+        if status == 304:
+            self.stats['revalidated'] += 1
+            data = stored
+            digest = entry['hash']
+        else:
+            self.stats['downloaded'] += 1
+            digest = hashlib.sha256(data).hexdigest()
+            await loop.run_in_executor(None, self._write_file, digest, data)
+
+        self._index[url] = {
+            'hash': digest,
+            'etag': headers.get('ETag', entry and entry.get('etag')),
+            'last_modified': headers.get(
+                'Last-Modified', entry and entry.get('last_modified')),
+            'checked': time.time(),
+        }
+        if not self._save_task:
+            self._save_task = asyncio.ensure_future(self._save_later())
+        return data
+
+    async def get(self, url):
+        """Return the content of an asset, downloading it if required."""
+        url = str(url)
+        future = self._inflight.get(url)
+        if future is None:
+            future = asyncio.ensure_future(self._load(url))
+            self._inflight[url] = future
+            future.add_done_callback(
+                lambda f: self._inflight.pop(url, None))
+        return await asyncio.shield(future)
@@ -1,5 +1,6 @@
 import asyncio
-import functools
+import json
+import os
 
 from io import BytesIO
 
@@ -110,18 +111,134 @@ def make_embed(msg_type='', title=None, icon=None, content=None,
     return embed
 
 
-async def _read_image_from_url(url):
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as resp:
-            return await resp.read()
+def _dominant_color(data, max_size=(64, 64)):
+    """Returns an rgb tuple of the dominant color of image data."""
+    with BytesIO(data) as fp:
+        thief = ColorThief(fp)
+        thief.image.thumbnail(max_size)
+        return thief.get_color(quality=1)
+
+
+class ColourCache:
+    """Cache of dominant colours for image URLs.
+
+    Concurrent requests for the same URL share one download. Images are
+    downscaled before their colours are quantized, away from the event
+    loop.
+
+    Parameters
+    -----------
+    path: :class:`str`, optional
+        JSON file to keep the colours in between restarts.
+    session: :class:`aiohttp.ClientSession`, optional
+        Session used to download images. A temporary session is used for
+        each download if not set.
+    assets: :class:`eevee.utils.assets.AssetCache`, optional
+        Local asset cache to read images through, instead of downloading
+        them directly.
+    save_delay: :class:`float`
+        Seconds to wait after a new colour before saving, so that colours
+        found together are saved together. Default is 5.
+    """
+
+    def __init__(self, path=None, *, session=None, assets=None,
+                 save_delay=5.0):
+        self.path = None
+        self.session = session
+        self.assets = assets
+        self.save_delay = save_delay
+        self._colours = {}
+        self._inflight = {}
+        self._save_task = None
+        if path:
+            self.set_path(path)
+
+    def __len__(self):
+        return len(self._colours)
+
+    def __contains__(self, url):
+        return str(url) in self._colours
+
+    def set(self, url, rgb):
+        """Store a known colour for a URL."""
+        self._colours[str(url)] = tuple(rgb)
+
+    def set_path(self, path):
+        """Set the file to persist colours to, loading any saved colours."""
+        self.path = path
+        try:
+            with open(path) as fp:
+                saved = json.load(fp)
+        except (OSError, ValueError):
+            return
+        for url, rgb in saved.items():
+            self._colours.setdefault(url, tuple(rgb))
+
+    def save(self, colours=None):
+        """Write the cached colours to the persistence file."""
+        if not self.path:
+            return
+        colours = self._colours if colours is None else colours
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as fp:
+            json.dump(colours, fp)
+        os.replace(tmp_path, self.path)
+
+    async def _read(self, url):
+        if self.assets:
+            return await self.assets.get(url)
+        if self.session and not self.session.closed:
+            async with self.session.get(url) as resp:
+                return await resp.read()
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url) as resp:
+                return await resp.read()
+
+    async def _load(self, url):
+        data = await self._read(url)
+        loop = asyncio.get_event_loop()
+        rgb = await loop.run_in_executor(None, _dominant_color, data)
+        self._colours[url] = rgb
+        if self.path and not self._save_task:
+            self._save_task = asyncio.ensure_future(self._save_later())
+        return rgb
+
+    async def _save_later(self):
+        await asyncio.sleep(self.save_delay)
+        self._save_task = None
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, self.save, dict(self._colours))
+
+    async def flush(self):
+        """Save colours waiting on a debounced save straight away."""
+        if not self._save_task:
+            return
+        self._save_task.cancel()
+        self._save_task = None
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, self.save, dict(self._colours))
+
+    async def get(self, url):
+        """Returns an rgb tuple of the dominant color given an image url."""
+        url = str(url)
+        rgb = self._colours.get(url)
+        if rgb is not None:
+            return rgb
+        future = self._inflight.get(url)
+        if future is None:
+            future = asyncio.ensure_future(self._load(url))
+            self._inflight[url] = future
+            future.add_done_callback(
+                lambda f: self._inflight.pop(url, None))
+        return await asyncio.shield(future)
+
+
+colour_cache = ColourCache()
 
 
 async def _dominant_color_from_url(url):
     """Returns an rgb tuple consisting the dominant color given a image url."""
-    with BytesIO(await _read_image_from_url(url)) as fp:
-        loop = asyncio.get_event_loop()
-        get_colour = functools.partial(ColorThief(fp).get_color, quality=1)
-        return await loop.run_in_executor(None, get_colour)
+    return await colour_cache.get(url)
 
 
 async def url_color(url):
@@ -1,7 +1,19 @@
+from collections import OrderedDict
 from enum import Enum
 
 from fuzzywuzzy import fuzz
 from fuzzywuzzy import process
+from fuzzywuzzy.utils import full_process
+
+try:
+    from rapidfuzz import fuzz as c_fuzz
+except ImportError:
+    c_fuzz = None
+
+if c_fuzz:
+    _ratio, _partial_ratio = c_fuzz.ratio, c_fuzz.partial_ratio
+else:
+    _ratio, _partial_ratio = fuzz.ratio, fuzz.partial_ratio
 
 def get_match(word_list: list, word: str, score_cutoff: int = 60, partial=False):
     """Uses fuzzywuzzy to see if word is close to entries in word_list
@@ -29,6 +41,100 @@ def get_matches(word_list: list, word: str, score_cutoff: int = 80, partial=Fals
     return process.extractBests(
         word, word_list, scorer=fuzz.ratio, score_cutoff=score_cutoff)
 
+def _trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i+3] for i in range(len(padded) - 2)}
+
+class FuzzyIndex:
+    """Fuzzy matcher for a fixed list of choices.
+
+    Choices are processed and indexed by trigram once, so each lookup only
+    scores choices that share a trigram with the query and could reach the
+    score cutoff. Scoring uses ``rapidfuzz`` if it's installed, otherwise
+    ``fuzzywuzzy``. Recent lookups are cached.
+
+    Scores and processing match :func:`get_match` and :func:`get_matches`.
+
+    Parameters
+    -----------
+    choices: iterable of :class:`str`
+        The strings to match against.
+    cache_size: :class:`int`
+        Maximum number of lookups to cache. Default is 256.
+    """
+
+    def __init__(self, choices, *, cache_size=256):
+        self.choices = tuple(choices)
+        self.cache_size = cache_size
+        self._processed = tuple(full_process(c) for c in self.choices)
+        self._grams = {}
+        for i, word in enumerate(self._processed):
+            for gram in _trigrams(word):
+                self._grams.setdefault(gram, []).append(i)
+        self._cache = OrderedDict()
+
+    def __len__(self):
+        return len(self.choices)
+
+    def _shortlist(self, word):
+        shortlist = set()
+        for gram in _trigrams(word):
+            shortlist.update(self._grams.get(gram, ()))
+        return sorted(shortlist)
+
+    def _score(self, word, candidates, score_cutoff, partial):
+        scorer = _partial_ratio if partial else _ratio
+        length = len(word)
+        results = []
+        for i in candidates:
+            choice = self._processed[i]
+            # a ratio can't exceed the share of the combined length that the
+            # shorter string makes up
+            if not partial:
+                other = len(choice)
+                if 200 * min(length, other) < score_cutoff * (length + other):
+                    continue
+            score = int(round(scorer(word, choice)))
+            if score >= score_cutoff:
+                results.append((-score, i))
+        results.sort()
+        return [(self.choices[i], -score) for score, i in results]
+
+    def _search(self, word, score_cutoff, partial):
+        word = full_process(word)
+        if not word:
+            return []
+        shortlist = self._shortlist(word)
+        results = self._score(word, shortlist, score_cutoff, partial)
+        if not results and len(shortlist) < len(self.choices):
+            # nothing shares enough with the query, so check everything
+            results = self._score(
+                word, range(len(self.choices)), score_cutoff, partial)
+        return results
+
+    def matches(self, word: str, score_cutoff: int = 80, partial=False,
+                limit=5):
+        """Returns a list of up to ``limit`` tuples with (MATCH, SCORE)"""
+        key = (word, score_cutoff, partial, limit)
+        result = self._cache.get(key)
+        if result is not None:
+            self._cache.move_to_end(key)
+            return list(result)
+        result = self._search(word, score_cutoff, partial)[:limit]
+        self._cache[key] = tuple(result)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+    def match(self, word: str, score_cutoff: int = 60, partial=False):
+        """Returns a tuple of (MATCH, SCORE)"""
+        result = self.matches(word, score_cutoff, partial, limit=1)
+        if not result:
+            return (None, None)
+        return result[0]
+
+_enum_indexes = {}
+
 class FuzzyEnum(Enum):
     """Enumeration with fuzzy-matching classmethods."""
 
@@ -40,14 +146,23 @@ class FuzzyEnum(Enum):
     def value_list(cls):
         return [e.value for e in cls]
 
+    @classmethod
+    def _fuzzy_index(cls, attr):
+        index = _enum_indexes.get((cls, attr))
+        if index is None:
+            if attr == 'name':
+                index = FuzzyIndex(cls.name_list())
+            else:
+                index = FuzzyIndex(cls.value_list())
+            _enum_indexes[(cls, attr)] = index
+        return index
+
     @classmethod
     def match_name(cls, arg):
-        word_list = cls.name_list()
-        match = get_match(word_list, arg, score_cutoff=80)[0]
+        match = cls._fuzzy_index('name').match(arg, score_cutoff=80)[0]
         return cls[match]
 
     @classmethod
     def match_value(cls, arg):
-        word_list = cls.value_list()
-        match = get_match(word_list, arg, score_cutoff=80)[0]
+        match = cls._fuzzy_index('value').match(arg, score_cutoff=80)[0]
         return cls(match)